@@ -1,66 +1,156 @@
 from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
 import json
+import threading
 
 from config import Config
 from models.data_manager import DataManager
+from models.sqlite_data_manager import SQLiteDataManager
 from models.user import User
+from models.user_cache import UserCache
+from models.records import Record
 from routes import register_routes
+from cli import register_commands
+from services.markdown_cache import MarkdownCache
+from services.ai_service import AIService, ResponseCache
+from services.job_queue import JobQueue
 
-# 创建应用实例
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# 跨域配置
-CORS(app)
-
-# 登录管理
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
-
-# 初始化数据管理器
-data_manager = DataManager(app.config['DATA_DIR'])
-
-@login_manager.user_loader
-def load_user(user_id):
-    return data_manager.get_user_by_id(user_id)
-
-# 注册所有路由
-register_routes(app, data_manager)
-
-# 主页路由
-@app.route('/')
-def index():
-    if current_user.is_authenticated:
-        return redirect(url_for('dashboard.index'))
-    return redirect(url_for('auth.login'))
-
-# 错误处理
-@app.errorhandler(404)
-def not_found(error):
-    return render_template('404.html'), 404
+class JSONProvider(DefaultJSONProvider):
+    """jsonify 和模板的 tojson 支持紧凑记录类型"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
-@app.errorhandler(500)
-def internal_error(error):
-    return render_template('500.html'), 500
+def create_data_manager(config):
+    """按配置创建数据管理器（JSON文件或SQLite）"""
+    log_options = {
+        'rotate_daily': config['LOG_ROTATE_DAILY'],
+        'max_bytes': config['LOG_SEGMENT_MAX_BYTES'],
+        'compression': config['LOG_COMPRESSION'],
+        'retention_days': config['LOG_RETENTION_DAYS'],
+        'mode': config['LOG_WRITE_MODE'],
+        'flush_interval': config['LOG_FLUSH_INTERVAL'],
+        'queue_size': config['LOG_QUEUE_SIZE']
+    }
+    if config['STORAGE_BACKEND'] == 'sqlite':
+        return SQLiteDataManager(
+            config['DATA_DIR'], config['SQLITE_PATH'],
+            log_options=log_options,
+            views_flush_interval=config['KNOWLEDGE_VIEWS_FLUSH_INTERVAL'],
+            codec=config['STORAGE_JSON_CODEC'],
+            index_save_interval=config['SEARCH_INDEX_SAVE_INTERVAL']
+        )
+    return DataManager(
+        config['DATA_DIR'],
+        compact_min_events=config['STORAGE_COMPACT_MIN_EVENTS'],
+        fsync=config['STORAGE_FSYNC'],
+        fsync_interval=config['STORAGE_FSYNC_INTERVAL'],
+        log_options=log_options,
+        views_flush_interval=config['KNOWLEDGE_VIEWS_FLUSH_INTERVAL'],
+        codec=config['STORAGE_JSON_CODEC'],
+        pretty_json=config['STORAGE_PRETTY_JSON'],
+        index_save_interval=config['SEARCH_INDEX_SAVE_INTERVAL']
+    )
 
-if __name__ == '__main__':
+def create_app(config=Config):
+    """创建应用实例
+    
+    供 wsgi.py（gunicorn/waitress 等多进程、多线程服务器）和开发服务器使用。
+    应用用到的共享对象（数据管理器、缓存、AI服务、任务队列）都挂在应用实例上，
+    不使用模块级全局变量；数据目录和默认数据在这里初始化。
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.json = JSONProvider(app)
+    
+    # 跨域配置
+    CORS(app)
+    
+    # 登录管理
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    
     # 确保数据目录存在
     os.makedirs(app.config['DATA_DIR'], exist_ok=True)
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
-    # 初始化数据
+    # 初始化数据管理器和默认数据（多个进程同时初始化是安全的）
+    data_manager = create_data_manager(app.config)
     data_manager.init_data()
     
-    # 启动应用
+    # 登录用户缓存，用户数据变化时自动失效
+    app.user_cache = UserCache(data_manager.get_user_by_id, data_manager.users_version,
+                               app.config['USER_CACHE_SIZE'])
+    
+    @login_manager.user_loader
+    def load_user(user_id):
+        return app.user_cache.get(user_id)
+    
+    # 知识文章渲染缓存
+    app.markdown_cache = MarkdownCache(app.config['MARKDOWN_CACHE_SIZE'],
+                                       app.config['MARKDOWN_CACHE_DIR'])
+    
+    # AI服务（各请求共用，以便共享回复缓存）
+    app.ai_service = AIService(
+        app.config['DEEPSEEK_API_KEY'],
+        app.config['DEEPSEEK_API_BASE'],
+        cache=ResponseCache(app.config['AI_CACHE_TTL'], app.config['AI_CACHE_SIZE'],
+                            app.config['AI_CACHE_DIR']),
+        pool_size=app.config['AI_POOL_SIZE'],
+        max_retries=app.config['AI_MAX_RETRIES'],
+        timeout=app.config['AI_REQUEST_TIMEOUT'],
+        chunk_tokens=app.config['AI_CHUNK_TOKENS'],
+        map_workers=app.config['AI_MAP_WORKERS']
+    )
+    
+    # 后台任务队列（AI调用等耗时操作）
+    app.job_queue = JobQueue(app.config['AI_JOB_WORKERS'], app.config['JOB_RESULT_TTL'],
+                             app.config['JOB_STATE_DIR'])
+    # 批量导入任务（与AI任务分开排队，互不阻塞），状态文件放在同一目录
+    app.import_queue = JobQueue(app.config['IMPORT_JOB_WORKERS'], app.config['JOB_RESULT_TTL'],
+                                app.config['JOB_STATE_DIR'])
+    
+    # 实时总结在请求线程中调用AI，与后台任务一样限制同时进行的数量
+    app.ai_stream_slots = threading.BoundedSemaphore(app.config['AI_STREAM_SLOTS'])
+    
+    # 注册所有路由
+    register_routes(app, data_manager)
+    
+    # 命令行工具（flask import-data / export-data）
+    register_commands(app)
+    
+    # 主页路由
+    @app.route('/')
+    def index():
+        if current_user.is_authenticated:
+            return redirect(url_for('dashboard.index'))
+        return redirect(url_for('auth.login'))
+    
+    # 错误处理
+    @app.errorhandler(404)
+    def not_found(error):
+        return render_template('404.html'), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        return render_template('500.html'), 500
+    
+    return app
+
+if __name__ == '__main__':
+    # 开发服务器，生产环境请使用 gunicorn（见 wsgi.py 和 gunicorn.conf.py）
+    app = create_app()
     app.run(
         host=app.config['HOST'],
         port=app.config['PORT'],
         debug=app.config['DEBUG']
     )
-
@@ -0,0 +1,92 @@
+"""命令行工具（flask 命令）
+
+    flask --app wsgi import-data issues issues.csv
+    flask --app wsgi import-data users users.jsonl --operator admin --batch-size 1000
+    flask --app wsgi export-data tasks tasks.csv --filter province=广东 --since 2024-01-01
+
+导入文件的格式按扩展名判断（.csv / .jsonl），也可以用 --format 指定；
+导出的输出文件为 - 时写到标准输出。
+"""
+import sys
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from services.bulk_io import KINDS, FORMATS, EXPORT_FILTERS, detect_format, import_file, export_stream
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(KINDS))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='文件格式，默认按扩展名判断')
+@click.option('--operator', default='admin', show_default=True,
+              help='操作人用户名，未填写提交人/创建人的问题和任务记为此人创建')
+@click.option('--batch-size', type=int, help='每批写入的记录数，默认为配置的 BULK_BATCH_SIZE')
+@with_appcontext
+def import_data(kind, path, fmt, operator, batch_size):
+    """从CSV/JSONL文件批量导入问题、任务或用户"""
+    data_manager = current_app.data_manager
+    try:
+        fmt = fmt or detect_format(path)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    user = data_manager.get_user_by_username(operator)
+    if user is None:
+        raise click.UsageError(f'用户不存在: {operator}')
+
+    def progress(info):
+        click.echo(f"第 {info['batches']} 批: 已处理 {info['processed']} 行，"
+                   f"导入 {info['imported']} 条，失败 {info['failed']} 条", err=True)
+
+    result = import_file(data_manager, kind, path, fmt, user.id,
+                         batch_size=batch_size or current_app.config['BULK_BATCH_SIZE'],
+                         progress=progress)
+    for error in result['errors']:
+        click.echo(f"第 {error['line']} 行: {error['message']}", err=True)
+    if result['failed'] > len(result['errors']):
+        click.echo(f"……另有 {result['failed'] - len(result['errors'])} 行失败", err=True)
+    data_manager.add_system_log(user.id, 'import_data',
+                                f"命令行批量导入{kind}: {path}，导入 {result['imported']} 条")
+    click.echo(f"导入完成: 共 {result['processed']} 行，导入 {result['imported']} 条，"
+               f"失败 {result['failed']} 条")
+    if result['failed']:
+        sys.exit(1)
+
+
+@click.command('export-data')
+@click.argument('kind', type=click.Choice(KINDS))
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS),
+              help='输出格式，默认按输出文件扩展名判断，写到标准输出时为 jsonl')
+@click.option('--filter', 'filters', multiple=True, metavar='FIELD=VALUE',
+              help='相等条件，可以多次指定，如 --filter province=广东')
+@click.option('--since', type=click.DateTime(['%Y-%m-%d']), help='创建日期起（含）')
+@click.option('--until', type=click.DateTime(['%Y-%m-%d']), help='创建日期止（含）')
+@with_appcontext
+def export_data(kind, output, fmt, filters, since, until):
+    """按条件导出问题、任务或用户为CSV/JSONL"""
+    if fmt is None:
+        try:
+            name = getattr(output, 'name', '<stdout>')
+            fmt = 'jsonl' if name == '<stdout>' else detect_format(name)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+    conditions = {}
+    for item in filters:
+        field, sep, value = item.partition('=')
+        if not sep or field not in EXPORT_FILTERS[kind]:
+            raise click.UsageError(f'无效的条件: {item}，可用字段: {", ".join(EXPORT_FILTERS[kind])}')
+        conditions[field] = value
+    for chunk in export_stream(current_app.data_manager, kind, fmt, conditions,
+                               since=since.date().isoformat() if since else None,
+                               # 结束日期当天也包含在内
+                               until=(until.date() + timedelta(days=1)).isoformat() if until else None):
+        output.write(chunk)
+
+
+def register_commands(app):
+    """注册命令行工具"""
+    app.cli.add_command(import_data)
+    app.cli.add_command(export_data)
@@ -17,7 +17,31 @@ class Config:
     
     # DeepSeek API配置
     DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY') or ''
-    DEEPSEEK_API_BASE = 'https://api.deepseek.com/v1'
+    DEEPSEEK_API_BASE = os.environ.get('DEEPSEEK_API_BASE') or 'https://api.deepseek.com/v1'
+    
+    # AI接口连接: 连接池大小，429/5xx的重试次数（指数退避），读取超时（秒）
+    AI_POOL_SIZE = 10
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES') or 3)
+    AI_REQUEST_TIMEOUT = int(os.environ.get('AI_REQUEST_TIMEOUT') or 30)
+    
+    # AI分批总结: 每个提示词中数据部分的token预算（超出时分批提炼要点再合并），同时总结的批数
+    AI_CHUNK_TOKENS = int(os.environ.get('AI_CHUNK_TOKENS') or 6000)
+    AI_MAP_WORKERS = 4
+    
+    # AI后台任务: 同时执行的任务数，结束的任务结果保留的秒数
+    AI_JOB_WORKERS = 2
+    JOB_RESULT_TTL = 3600
+    JOB_STATE_DIR = os.path.join(DATA_DIR, 'jobs')
+    # 每个进程同时进行的实时（SSE）总结数，占用Web工作线程，名额满时返回429
+    AI_STREAM_SLOTS = AI_JOB_WORKERS
+    
+    # AI回复缓存: 相同的请求在有效期（秒）内直接返回缓存结果；设置目录后同时保存到磁盘
+    AI_CACHE_TTL = 3600
+    AI_CACHE_SIZE = 128
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR') or None
+    
+    # 登录用户缓存的最大用户数（用户数据变化时整体失效）
+    USER_CACHE_SIZE = 1024
     
     # 数据存储路径
     USERS_FILE = os.path.join(DATA_DIR, 'users.json')
@@ -28,10 +52,58 @@ class Config:
     KNOWLEDGE_FILE = os.path.join(DATA_DIR, 'knowledge.json')
     LOGS_FILE = os.path.join(DATA_DIR, 'system_logs.jsonl')
     
+    # 存储后端: json（默认，data目录下的JSON/JSONL文件）或 sqlite
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'json'
+    SQLITE_PATH = os.path.join(DATA_DIR, 'sysdemo.db')
+    
+    # 问题/任务事件日志累计的事件数超过该值（且多于记录数）时压缩为快照
+    STORAGE_COMPACT_MIN_EVENTS = 1000
+    
+    # JSON存储的落盘策略: always（每次写入都fsync）、batch（追加写最多每
+    # STORAGE_FSYNC_INTERVAL 秒fsync一次）、off（交给操作系统）
+    STORAGE_FSYNC = os.environ.get('STORAGE_FSYNC') or 'batch'
+    STORAGE_FSYNC_INTERVAL = 1.0
+    
+    # JSON编解码器: orjson / json，不设置时已安装 orjson 则使用 orjson；
+    # 数据文件默认紧凑存储，STORAGE_PRETTY_JSON=1 时缩进，便于调试时直接查看
+    STORAGE_JSON_CODEC = os.environ.get('STORAGE_JSON_CODEC') or None
+    STORAGE_PRETTY_JSON = os.environ.get('STORAGE_PRETTY_JSON', '').lower() in ('1', 'true', 'yes')
+    
+    # 系统日志切分归档: 每天或超过大小上限时切出 system_logs-YYYYMMDD.jsonl，
+    # 归档段压缩为 gzip（安装了 zstandard 时可选 zstd，none 为不压缩）
+    LOG_ROTATE_DAILY = True
+    LOG_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+    LOG_COMPRESSION = os.environ.get('LOG_COMPRESSION') or 'gzip'
+    # 归档段保留天数，0 表示永久保留
+    LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS') or 0)
+    
+    # 系统日志写入模式: sync（请求内直接写入）、batched（后台线程合并写入，
+    # 请求等待写入完成）、async（请求不等待，最多延迟 LOG_FLUSH_INTERVAL 秒写入）
+    LOG_WRITE_MODE = os.environ.get('LOG_WRITE_MODE') or 'batched'
+    LOG_FLUSH_INTERVAL = 0.5
+    LOG_QUEUE_SIZE = 10000
+    
     # 上传文件配置
     UPLOAD_FOLDER = os.path.join(DATA_DIR, 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     
+    # 批量导入: 每批校验、写入的记录数（每批加一次锁、写一次文件）；
+    # 网页上传的导入文件先保存在该目录，由后台任务读取，导入结束后删除
+    BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE') or 500)
+    # 导入任务使用单独的后台队列，同时执行的导入数，不占用AI任务的名额
+    IMPORT_JOB_WORKERS = 1
+    IMPORT_DIR = os.path.join(UPLOAD_FOLDER, 'imports')
+    
     # 分页配置
     ITEMS_PER_PAGE = 20
+    
+    # 知识文章Markdown渲染缓存: 内存中缓存的文章数；设置目录后渲染结果同时保存到磁盘
+    MARKDOWN_CACHE_SIZE = 256
+    MARKDOWN_CACHE_DIR = os.environ.get('MARKDOWN_CACHE_DIR') or None
+    
+    # 知识浏览次数在内存中累加，每隔该秒数合并写入一次（进程退出时也会写入）
+    KNOWLEDGE_VIEWS_FLUSH_INTERVAL = 10.0
+    
+    # 知识库全文索引修改后每隔该秒数保存一次索引文件（进程退出时也会保存）
+    SEARCH_INDEX_SAVE_INTERVAL = 5.0
 
@@ -0,0 +1,29 @@
+"""gunicorn 配置: gunicorn -c gunicorn.conf.py wsgi:app
+
+多进程 + 多线程（gthread）。JSON存储和SQLite存储都支持多个工作进程同时读写：
+JSON文件的读-改-写由 fcntl 文件锁串行化，各进程通过文件戳发现其他进程的修改；
+SQLite使用WAL模式。Windows 下没有 fcntl，JSON存储只能单进程运行，请改用 waitress（见 wsgi.py）。
+"""
+import os
+import multiprocessing
+
+from config import Config
+
+bind = os.environ.get('GUNICORN_BIND') or f'{Config.HOST}:{Config.PORT}'
+workers = int(os.environ.get('GUNICORN_WORKERS') or min(multiprocessing.cpu_count() * 2 + 1, 8))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+
+# 在主进程中加载应用并初始化数据，再 fork 出工作进程；
+# 后台线程（日志写入、浏览计数、任务队列）和数据库连接在各工作进程中按需重新创建
+preload_app = True
+
+# AI总结的流式输出可能持续较长时间
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+pidfile = os.path.join(Config.BASE_DIR, 'logs', 'gunicorn.pid')
+accesslog = os.path.join(Config.BASE_DIR, 'logs', 'access.log')
+errorlog = os.path.join(Config.BASE_DIR, 'logs', 'app.log')
+loglevel = 'info'
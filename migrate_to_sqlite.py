@@ -0,0 +1,13 @@
+"""将 data 目录下的 JSON/JSONL 数据一次性导入 SQLite
+
+用法: python migrate_to_sqlite.py
+导入完成后在 .env 中设置 STORAGE_BACKEND=sqlite 并重启应用。
+"""
+from config import Config
+from models.sqlite_data_manager import migrate_json_to_sqlite
+
+if __name__ == '__main__':
+    counts = migrate_json_to_sqlite(Config.DATA_DIR, Config.SQLITE_PATH)
+    print(f'已导入到 {Config.SQLITE_PATH}:')
+    for table, count in counts.items():
+        print(f'  {table}: {count} 条')
@@ -0,0 +1,80 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库 json
+    orjson = None
+
+from models.records import json_default
+
+
+class StdlibCodec:
+    """标准库 json 编解码，输出UTF-8字节，中文不转义"""
+
+    name = 'json'
+
+    @staticmethod
+    def dumps(value, pretty=False):
+        return json.dumps(value, ensure_ascii=False, indent=2 if pretty else None,
+                          separators=None if pretty else (',', ':'),
+                          default=json_default).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson 编解码，编码和解码都直接处理字节，速度为标准库的数倍"""
+
+    name = 'orjson'
+
+    @staticmethod
+    def dumps(value, pretty=False):
+        return orjson.dumps(value, default=json_default,
+                            option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+def get_codec(name=None):
+    """按名称返回编解码器：json / orjson，不指定时已安装 orjson 则使用 orjson
+
+    两者的解码错误都是 ValueError（json.JSONDecodeError）的子类。
+    """
+    if name in (None, '', 'auto'):
+        return OrjsonCodec if orjson is not None else StdlibCodec
+    if name == 'orjson':
+        if orjson is None:
+            print('orjson is not installed, using the standard json module')
+            return StdlibCodec
+        return OrjsonCodec
+    if name == 'json':
+        return StdlibCodec
+    raise ValueError(f'Unknown JSON codec: {name}')
+
+
+def loads_lines(codec, data):
+    """解码JSONL字节块（只包含完整的行），返回 (记录列表, 损坏的行)
+
+    先把所有行拼成一个数组一次解码；有损坏的行时再逐行解码，跳过损坏的行。
+    """
+    lines = [line for line in data.split(b'\n') if line and line != b'\r']
+    if not lines:
+        return [], []
+    try:
+        entries = codec.loads(b'[' + b','.join(lines) + b']')
+        # 损坏的半行可能与下一行拼成合法JSON，条数不一致时按逐行处理
+        if len(entries) == len(lines):
+            return entries, []
+    except ValueError:
+        pass
+    entries, corrupt = [], []
+    for line in lines:
+        try:
+            entries.append(codec.loads(line))
+        except ValueError as e:
+            corrupt.append(e)
+    return entries, corrupt
@@ -0,0 +1,280 @@
+from bisect import bisect_left, insort
+
+
+class Collection:
+    """常驻内存的记录集合
+
+    保存从文件加载的全部记录，并维护两类索引：
+    - 唯一索引：主键 id 以及 users 的 username 等，按键查找为 O(1)
+    - 二级索引：省份、负责人、状态等过滤字段，值 -> 记录，供 find 按条件查询
+    另外按 (范围字段, 范围值, 分组字段) 维护分组计数，供看板统计直接读取；
+    按 (order_field, 主键) 排好序的主键列表（全部记录和各二级索引的取值各一个），供游标分页。
+    索引、计数和排序在首次使用时构建，之后由 add/update/remove 增量维护。
+    指定 record_type（models.records 中的记录类型）时，记录以该紧凑类型保存。
+    """
+
+    def __init__(self, records, stamp=None, key='id', unique_fields=(), index_fields=(),
+                 count_scopes=(), count_fields=(), record_type=None, order_field='created_at'):
+        self.record_type = record_type
+        if record_type is not None:
+            records = [record_type.from_dict(record) for record in records]
+        self.records = records
+        self.stamp = stamp
+        self.key = key
+        # 事件日志中自上次快照以来的事件数
+        self.events = 0
+        # 字段 -> {值: 记录}，None 表示尚未构建
+        self._unique = {field: None for field in (key,) + tuple(unique_fields)}
+        # 字段 -> {值: {主键: 记录}}，None 表示尚未构建
+        self._secondary = {field: None for field in index_fields}
+        # 主键 -> 记录在集合中的次序，用于按原始顺序返回查询结果
+        self._position = None
+        self._next_position = 0
+        # (范围字段, 范围值, 分组字段) -> {分组值: 数量}，范围字段为None表示全部记录
+        self._count_scopes = tuple(count_scopes)
+        self._count_fields = tuple(count_fields)
+        self._counts = None
+        # (二级索引字段, 值) -> 按 (order_field, 主键) 升序的列表，(None, None) 为全部记录
+        self.order_field = order_field
+        self._sorted = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def _unique_index(self, field):
+        index = self._unique[field]
+        if index is None:
+            index = {}
+            for record in self.records:
+                # 与线性查找保持一致：重复值时取第一条
+                index.setdefault(record.get(field), record)
+            self._unique[field] = index
+        return index
+
+    def _secondary_index(self, field):
+        index = self._secondary[field]
+        if index is None:
+            index = {}
+            for record in self.records:
+                index.setdefault(record.get(field), {})[record.get(self.key)] = record
+            self._secondary[field] = index
+        return index
+
+    def _positions(self):
+        if self._position is None:
+            self._position = {record.get(self.key): n for n, record in enumerate(self.records)}
+            self._next_position = len(self.records)
+        return self._position
+
+    def _count_record(self, record, delta, counts=None):
+        """把一条记录计入（delta=1）或移出（delta=-1）分组计数，counts 默认为当前计数"""
+        if counts is None:
+            counts = self._counts
+        scopes = [(None, None)] + [(field, record.get(field)) for field in self._count_scopes]
+        for scope_field, scope_value in scopes:
+            for field in self._count_fields:
+                bucket = counts.setdefault((scope_field, scope_value, field), {})
+                value = record.get(field)
+                n = bucket.get(value, 0) + delta
+                if n:
+                    bucket[value] = n
+                else:
+                    bucket.pop(value, None)
+
+    def counts(self, field, **scope):
+        """返回范围内按字段分组的计数 {值: 数量}
+
+        scope 最多一个范围条件（如 province='广东'）；字段或范围不在计数定义内时返回None。
+        与 add/update/remove 一样，调用方需持有集合所属数据管理器的缓存锁。
+        """
+        if field not in self._count_fields or len(scope) > 1:
+            return None
+        scope_field, scope_value = next(iter(scope.items()), (None, None))
+        if scope_field is not None and scope_field not in self._count_scopes:
+            return None
+        if self._counts is None:
+            # 统计完再一次赋值，不会有其他线程看到统计了一半的计数
+            counts = {}
+            for record in self.records:
+                self._count_record(record, 1, counts)
+            self._counts = counts
+        return dict(self._counts.get((scope_field, scope_value, field), {}))
+
+    def _sort_key(self, record):
+        return (record.get(self.order_field) or '', record.get(self.key) or '')
+
+    def _sorted_slots(self, record):
+        """记录所在的已构建排序列表"""
+        slots = [(None, None)] + [(field, record.get(field)) for field in self._secondary]
+        return [self._sorted[slot] for slot in slots if slot in self._sorted]
+
+    def _sorted_keys(self, filters):
+        """条件中最有选择性的二级索引取值对应的排序列表，没有可用索引时为全部记录的列表"""
+        slot, candidates = (None, None), None
+        for field, value in filters.items():
+            if field in self._secondary:
+                bucket = self._secondary_index(field).get(value, {})
+                if candidates is None or len(bucket) < len(candidates):
+                    slot, candidates = (field, value), bucket
+        keys = self._sorted.get(slot)
+        if keys is None:
+            records = self.records if candidates is None else candidates.values()
+            keys = sorted(self._sort_key(record) for record in records)
+            self._sorted[slot] = keys
+        return keys
+
+    def page(self, before=None, limit=20, **filters):
+        """按 (order_field, 主键) 倒序返回排在 before 之前的最多 limit 条记录，以及之后是否还有记录
+
+        在候选集的排序列表中二分定位 before，再向前逐条判断其余条件，
+        不需要复制和排序全部命中的记录。
+        """
+        keys = self._sorted_keys(filters)
+        end = len(keys) if before is None else bisect_left(keys, tuple(before))
+        items = filters.items()
+        page = []
+        for n in range(end - 1, -1, -1):
+            record = self.get(keys[n][1])
+            if record is not None and all(record.get(field) == value for field, value in items):
+                if len(page) == limit:
+                    return page, True
+                page.append(record)
+        return page, False
+
+    def rebuild_counts(self):
+        """丢弃分组计数，下次读取时从全部记录重新统计"""
+        self._counts = None
+
+    def get(self, value, field=None):
+        """按唯一字段查找记录，默认按主键"""
+        return self._unique_index(field or self.key).get(value)
+
+    def _candidates(self, filters):
+        """按条件中最有选择性的二级索引确定候选记录（按集合原始顺序），没有可用索引时为全部记录"""
+        candidates = None
+        for field, value in filters.items():
+            if field in self._secondary:
+                bucket = self._secondary_index(field).get(value, {})
+                if candidates is None or len(bucket) < len(candidates):
+                    candidates = bucket
+        if candidates is None:
+            return self.records
+        positions = self._positions()
+        return sorted(candidates.values(), key=lambda r: positions[r.get(self.key)])
+
+    def find(self, **filters):
+        """按字段相等条件查询，返回按集合原始顺序排列的记录列表
+
+        有二级索引的条件中选结果最少的一个作为候选集，其余条件逐条过滤；
+        没有可用索引时退化为全量扫描。
+        """
+        records = self._candidates(filters)
+        if not filters:
+            return list(records)
+        items = filters.items()
+        return [r for r in records if all(r.get(field) == value for field, value in items)]
+
+    def iter(self, predicate=None, **filters):
+        """按条件逐条返回记录的迭代器，顺序与 find 相同
+
+        候选集与 find 一样由索引确定（调用时复制记录引用，之后的写入不影响本次迭代），
+        其余条件和 predicate(record) 在迭代时逐条判断，调用方停止迭代后不再检查剩余记录。
+        """
+        records = list(self._candidates(filters))
+        items = filters.items()
+        return (r for r in records
+                if all(r.get(field) == value for field, value in items)
+                and (predicate is None or predicate(r)))
+
+    def add(self, record):
+        """追加记录，返回集合中保存的记录"""
+        if self.record_type is not None:
+            record = self.record_type.from_dict(record)
+        self.records.append(record)
+        record_key = record.get(self.key)
+        for field, index in self._unique.items():
+            if index is not None:
+                index.setdefault(record.get(field), record)
+        for field, index in self._secondary.items():
+            if index is not None:
+                index.setdefault(record.get(field), {})[record_key] = record
+        if self._position is not None:
+            self._position.setdefault(record_key, self._next_position)
+            self._next_position += 1
+        if self._counts is not None:
+            self._count_record(record, 1)
+        if self._sorted:
+            sort_key = self._sort_key(record)
+            for keys in self._sorted_slots(record):
+                insort(keys, sort_key)
+        return record
+
+    def push(self, record, field, item):
+        """向记录的列表字段追加一个元素"""
+        if self.record_type is not None:
+            item = record.child(field, item)
+        record.setdefault(field, []).append(item)
+
+    def update(self, record, changes):
+        """修改记录字段，并同步受影响的索引"""
+        record_key = record.get(self.key)
+        recount = self._counts is not None and any(
+            field in changes and changes[field] != record.get(field)
+            for field in self._count_scopes + self._count_fields)
+        if recount:
+            self._count_record(record, -1)
+        for field, value in changes.items():
+            old = record.get(field)
+            if old != value:
+                if field in self._unique:
+                    # 唯一字段变更很少见，直接让索引在下次查询时重建
+                    self._unique[field] = None
+                    self._position = None
+                    if field == self.key:
+                        for name in self._secondary:
+                            self._secondary[name] = None
+                        self._sorted = {}
+                if field == self.order_field:
+                    self._sorted = {}
+                elif field in self._secondary and self._sorted:
+                    sort_key = self._sort_key(record)
+                    old_keys = self._sorted.get((field, old))
+                    if old_keys is not None:
+                        n = bisect_left(old_keys, sort_key)
+                        if n < len(old_keys) and old_keys[n] == sort_key:
+                            del old_keys[n]
+                    new_keys = self._sorted.get((field, value))
+                    if new_keys is not None:
+                        insort(new_keys, sort_key)
+                index = self._secondary.get(field)
+                if index is not None:
+                    bucket = index.get(old)
+                    if bucket is not None:
+                        bucket.pop(record_key, None)
+                        if not bucket:
+                            del index[old]
+                    index.setdefault(value, {})[record_key] = record
+            record[field] = value
+        if recount:
+            self._count_record(record, 1)
+
+    def remove(self, value):
+        """按主键删除记录，返回是否删除了记录"""
+        before = len(self.records)
+        removed = [r for r in self.records if r.get(self.key) == value]
+        self.records[:] = [r for r in self.records if r.get(self.key) != value]
+        if len(self.records) == before:
+            return False
+        for record in removed:
+            sort_key = self._sort_key(record)
+            for keys in self._sorted_slots(record):
+                n = bisect_left(keys, sort_key)
+                if n < len(keys) and keys[n] == sort_key:
+                    del keys[n]
+        for field in self._unique:
+            self._unique[field] = None
+        for field in self._secondary:
+            self._secondary[field] = None
+        self._position = None
+        self._counts = None
+        return True
@@ -1,13 +1,104 @@
 import os
 import json
+import time
+import base64
+import binascii
 import uuid
+import tempfile
+import heapq
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.user import User
+from models.collection import Collection
+from models.records import IssueRecord, TaskRecord, ObjectiveRecord, UserRecord
+from models.codec import get_codec, loads_lines
+from models.log_store import SystemLogStore, truncate_partial_line
+from models.search_index import SearchIndex, IndexSaver
+from models.view_counter import ViewCounter
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只使用进程内的线程锁
+    fcntl = None
+
+# issues.jsonl / tasks.jsonl 为只追加的事件日志：
+#   不带 _op 的行是完整记录（新建或压缩后的快照）
+#   {"_op": "patch", "id": ..., "fields": {...}}                修改字段
+#   {"_op": "push", "id": ..., "field": "comments", "item": {...}, "fields": {...}}
+#                                                               向列表字段追加一项
+EVENT_OP = '_op'
+
+# 二级索引字段：集合 -> 字段
+INDEX_FIELDS = {
+    'objectives': ('target_user', 'target_province', 'status', 'parent_id'),
+    'issues': ('submitter_id', 'province', 'assigned_to', 'status', 'category'),
+    'tasks': ('assigned_to', 'province', 'status'),
+    'knowledge': ('category',),
+}
+
+# 看板分组计数：集合 -> (范围字段, 分组字段)
+COUNTER_FIELDS = {
+    'objectives': (('target_user', 'target_province'), ('status',)),
+    'issues': (('submitter_id', 'province'), ('status', 'category')),
+    'tasks': (('assigned_to', 'province'), ('status', 'province')),
+    'knowledge': ((), ('category',)),
+}
+
+# 常驻内存时使用的紧凑记录类型：集合 -> 记录类型（其余集合保存为字典）
+RECORD_TYPES = {
+    'users': UserRecord,
+    'objectives': ObjectiveRecord,
+    'issues': IssueRecord,
+    'tasks': TaskRecord,
+}
+
+# 角色的数据可见范围：集合 -> 角色 -> (记录字段, 用户属性)，admin 可见全部
+ROLE_SCOPES = {
+    'objectives': {'staff': ('target_user', 'id'), 'province_manager': ('target_province', 'province')},
+    'issues': {'staff': ('submitter_id', 'id'), 'province_manager': ('province', 'province')},
+    'tasks': {'staff': ('assigned_to', 'id'), 'province_manager': ('province', 'province')},
+}
+
+def encode_cursor(record, field='created_at'):
+    """把记录的 (时间, id) 编码为分页游标"""
+    raw = json.dumps([record.get(field) or '', record.get('id') or ''], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """解析分页游标为 (时间, id)，无效时返回None"""
+    try:
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (str(created_at), str(record_id))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+def knowledge_document(record):
+    """知识库文章中参与全文检索的字段"""
+    return {
+        'title': record.get('title') or '',
+        'tags': ' '.join(record.get('tags') or []),
+        'content': record.get('content') or '',
+    }
+
+def scope_filters(collection, user):
+    """返回用户角色在集合上的过滤条件，可直接传给 query"""
+    scope = ROLE_SCOPES.get(collection, {}).get(user.role)
+    if scope is None:
+        return {}
+    field, attr = scope
+    return {field: getattr(user, attr)}
 
 class DataManager:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, compact_min_events=1000, fsync='always', fsync_interval=1.0,
+                 log_options=None, views_flush_interval=10.0, codec=None, pretty_json=False,
+                 index_save_interval=5.0):
         self.data_dir = data_dir
+        # JSON编解码器（默认已安装 orjson 时使用 orjson）；pretty_json 时整文件写入带缩进，便于调试
+        self.codec = get_codec(codec)
+        self.pretty_json = pretty_json
         self.users_file = os.path.join(data_dir, 'users.json')
         self.roles_file = os.path.join(data_dir, 'roles.json')
         self.objectives_file = os.path.join(data_dir, 'objectives.json')
@@ -15,93 +106,459 @@ class DataManager:
         self.tasks_file = os.path.join(data_dir, 'tasks.jsonl')
         self.knowledge_file = os.path.join(data_dir, 'knowledge.json')
         self.logs_file = os.path.join(data_dir, 'system_logs.jsonl')
+        # 知识库全文索引，可以删除，下次搜索时重建
+        self.knowledge_index_file = os.path.join(data_dir, 'knowledge.index.json')
+        self._knowledge_index = None
+        self._knowledge_index_stamp = None
+        # 索引有单独的锁，切分文章和写索引文件都不持有缓存锁；修改后延迟保存
+        self._index_lock = threading.RLock()
+        self._index_saver = IndexSaver(self._save_search_index, self._index_lock, index_save_interval)
+        # 知识浏览次数先在内存中累加，定期合并写入
+        self.knowledge_views = ViewCounter(self._merge_knowledge_views, views_flush_interval)
+        # 系统日志使用本实例的文件锁和落盘策略写入，按 log_options 切分归档
+        self.system_logs = SystemLogStore(self.logs_file, locked=self._locked,
+                                          append_line=self._append_line, codec=self.codec,
+                                          **(log_options or {}))
+        
+        # 常驻内存的集合缓存: 文件路径 -> Collection
+        # 通过文件戳判断是否被外部修改，本实例的写操作直接更新缓存
+        self._cache = {}
+        self._cache_lock = threading.RLock()
+        # 集合名与文件的对应关系，供 query 使用
+        self._collection_files = {
+            'objectives': self.objectives_file,
+            'issues': self.issues_file,
+            'tasks': self.tasks_file,
+            'knowledge': self.knowledge_file,
+        }
+        # 支持批量导入导出的集合
+        self._bulk_files = {
+            'users': self.users_file,
+            'issues': self.issues_file,
+            'tasks': self.tasks_file,
+        }
+        # 除主键id外需要唯一索引的字段
+        self._unique_fields = {self.users_file: ('username',)}
+        self._record_types = {self._collection_files.get(name, self.users_file): record_type
+                              for name, record_type in RECORD_TYPES.items()}
+        self._index_fields = {self._collection_files[name]: fields
+                              for name, fields in INDEX_FIELDS.items()}
+        self._counter_fields = {self._collection_files[name]: fields
+                                for name, fields in COUNTER_FIELDS.items()}
+        # 事件日志中的事件数超过该值且多于记录数时压缩为快照
+        self.compact_min_events = compact_min_events
+        
+        # fsync策略: always 每次写入都落盘; batch 追加写最多每 fsync_interval 秒落盘一次;
+        # off 交给操作系统。任何策略下整文件写入都是写临时文件后原子替换
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._last_fsync = {}
+        # 每个文件一把线程锁，写一个文件时不阻塞其他文件的写入和缓存读取
+        self._file_locks = {}
+        self._file_locks_guard = threading.Lock()
+        # 当前线程已持有文件锁的文件（线程局部的 files 集合），用于锁的重入
+        self._held_locks = threading.local()
     
     def init_data(self):
         """初始化数据文件"""
         os.makedirs(self.data_dir, exist_ok=True)
         
-        # 初始化用户数据
-        if not os.path.exists(self.users_file):
-            default_users = [
-                {
-                    'id': str(uuid.uuid4()),
-                    'username': 'admin',
-                    'email': 'admin@sysdemo.com',
-                    'password_hash': generate_password_hash('admin123'),
-                    'role': 'admin',
-                    'province': None,
-                    'department': '系统管理部',
-                    'created_at': datetime.now().isoformat(),
-                    'is_active': True
-                }
-            ]
-            self._write_json(self.users_file, default_users)
+        # 多个工作进程同时启动时，由文件锁保证默认数据只写入一次
+        with self._locked(self.users_file):
+            # 初始化用户数据
+            if not os.path.exists(self.users_file):
+                default_users = [
+                    {
+                        'id': str(uuid.uuid4()),
+                        'username': 'admin',
+                        'email': 'admin@sysdemo.com',
+                        'password_hash': generate_password_hash('admin123'),
+                        'role': 'admin',
+                        'province': None,
+                        'department': '系统管理部',
+                        'created_at': datetime.now().isoformat(),
+                        'is_active': True
+                    }
+                ]
+                self._write_json(self.users_file, default_users)
         
-        # 初始化角色数据
-        if not os.path.exists(self.roles_file):
-            default_roles = [
-                {
-                    'id': 'admin',
-                    'name': '系统管理员',
-                    'permissions': ['all']
-                },
-                {
-                    'id': 'province_manager',
-                    'name': '省级管理员',
-                    'permissions': ['view_all', 'manage_province', 'create_objective', 'assign_task']
-                },
-                {
-                    'id': 'staff',
-                    'name': '普通员工',
-                    'permissions': ['view_own', 'report_progress', 'submit_issue', 'view_knowledge']
-                }
-            ]
-            self._write_json(self.roles_file, default_roles)
+            # 初始化角色数据
+            if not os.path.exists(self.roles_file):
+                default_roles = [
+                    {
+                        'id': 'admin',
+                        'name': '系统管理员',
+                        'permissions': ['all']
+                    },
+                    {
+                        'id': 'province_manager',
+                        'name': '省级管理员',
+                        'permissions': ['view_all', 'manage_province', 'create_objective', 'assign_task']
+                    },
+                    {
+                        'id': 'staff',
+                        'name': '普通员工',
+                        'permissions': ['view_own', 'report_progress', 'submit_issue', 'view_knowledge']
+                    }
+                ]
+                self._write_json(self.roles_file, default_roles)
         
-        # 初始化其他数据文件
-        for file in [self.objectives_file, self.knowledge_file]:
-            if not os.path.exists(file):
-                self._write_json(file, [])
+            # 初始化其他数据文件
+            for file in [self.objectives_file, self.knowledge_file]:
+                if not os.path.exists(file):
+                    self._write_json(file, [])
         
-        for file in [self.issues_file, self.tasks_file, self.logs_file]:
-            if not os.path.exists(file):
-                open(file, 'w').close()
+            for file in [self.issues_file, self.tasks_file, self.logs_file]:
+                if not os.path.exists(file):
+                    open(file, 'w').close()
+    
+    @contextmanager
+    def _locked(self, filepath):
+        """对文件的读-改-写加锁：该文件的线程锁 + 跨进程的 fcntl 文件锁（可重入）
+
+        不持有缓存锁：等待其他进程的文件锁、写入和 fsync 期间，其他线程照常读取缓存
+        （如每个请求加载登录用户）。持锁的线程修改缓存中的集合时另外短暂持有缓存锁。
+        """
+        held = getattr(self._held_locks, 'files', None)
+        if held is None:
+            held = self._held_locks.files = set()
+        if filepath in held:
+            yield
+            return
+        with self._file_locks_guard:
+            lock = self._file_locks.setdefault(filepath, threading.Lock())
+        with lock:
+            fd = None
+            if fcntl is not None:
+                fd = os.open(filepath + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            held.add(filepath)
+            try:
+                yield
+            finally:
+                held.discard(filepath)
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+    
+    def _atomic_write(self, filepath, payload):
+        """写入同目录的临时文件并 fsync，再用 os.replace 原子替换目标文件
+
+        并发读者要么看到旧文件，要么看到完整的新文件，不会读到写了一半的内容。
+        """
+        directory = os.path.dirname(filepath)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filepath) + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                if self.fsync != 'off':
+                    os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if self.fsync == 'always' and hasattr(os, 'O_DIRECTORY'):
+            # 目录项也落盘，保证替换在断电后仍然生效
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    
+    def _append_line(self, filepath, line):
+        """追加一行（bytes），按fsync策略落盘，返回 (inode, 写入后的文件末尾偏移)
+
+        调用方持有文件锁；文件末尾有上次中断留下的半行时先截掉，新行从行首开始。
+        """
+        with open(filepath, 'a+b') as f:
+            truncate_partial_line(f, filepath)
+            f.write(line)
+            f.flush()
+            if self.fsync == 'always':
+                os.fsync(f.fileno())
+            elif self.fsync == 'batch':
+                now = time.monotonic()
+                if now - self._last_fsync.get(filepath, 0) >= self.fsync_interval:
+                    os.fsync(f.fileno())
+                    self._last_fsync[filepath] = now
+            return os.fstat(f.fileno()).st_ino, f.tell()
+    
+    @staticmethod
+    def _file_stamp(filepath):
+        """获取文件戳(inode, mtime, size)，文件不存在时返回None"""
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _new_collection(self, filepath, records, stamp):
+        count_scopes, count_fields = self._counter_fields.get(filepath, ((), ()))
+        return Collection(records, stamp,
+                          unique_fields=self._unique_fields.get(filepath, ()),
+                          index_fields=self._index_fields.get(filepath, ()),
+                          count_scopes=count_scopes,
+                          count_fields=count_fields,
+                          record_type=self._record_types.get(filepath))
+    
+    def query(self, collection, **filters):
+        """按字段相等条件查询集合，如 query('tasks', province='广东', status='pending')
+
+        条件中的省份、负责人、状态等字段使用二级索引，只访问命中的记录。
+        """
+        return self._collection(self._collection_files[collection]).find(**filters)
+    
+    def paginate(self, collection, cursor=None, limit=20, **filters):
+        """按 (created_at, id) 倒序的游标分页，返回 (本页记录, 下一页游标)
+
+        cursor 为上一页返回的游标，为空或无效时返回第一页；没有更多数据时下一页游标为None。
+        集合按候选集维护排好序的主键列表，每页只二分定位游标并读取本页附近的记录。
+        """
+        records = self._collection(self._collection_files[collection])
+        position = decode_cursor(cursor) if cursor else None
+        with self._cache_lock:
+            page, more = records.page(position, limit, **filters)
+        next_cursor = encode_cursor(page[-1]) if more and page else None
+        return page, next_cursor
+    
+    def count_by(self, collection, field, **scope):
+        """按字段分组计数，如 count_by('issues', 'status', province='广东')
+
+        COUNTER_FIELDS 中定义的计数随每次写入增量维护，读取为O(1)；
+        其他组合退化为按 query 结果统计。
+        """
+        records = self._collection(self._collection_files[collection])
+        # 首次读取时构建计数，持有缓存锁，避免与并发写入的增量维护重复计数
+        with self._cache_lock:
+            counts = records.counts(field, **scope)
+            if counts is None:
+                rows = records.iter(**scope)
+        if counts is None:
+            counts = dict(Counter(r.get(field) for r in rows))
+        return counts
+    
+    def data_version(self, *collections):
+        """返回集合的数据版本标识，任一集合变化后改变，用于ETag等缓存校验"""
+        with self._cache_lock:
+            return ':'.join(repr(self._collection(self._collection_files[name]).stamp)
+                            for name in collections)
+    
+    def rebuild_counters(self):
+        """丢弃所有分组计数，下次读取时从数据重新统计（用于故障恢复）"""
+        with self._cache_lock:
+            for filepath in self._collection_files.values():
+                self._collection(filepath).rebuild_counts()
+    
+    def _collection(self, filepath):
+        """从缓存读取集合，文件戳变化时重新加载"""
+        with self._cache_lock:
+            if filepath.endswith('.jsonl'):
+                return self._event_collection(filepath)
+            stamp = self._file_stamp(filepath)
+            collection = self._cache.get(filepath)
+            if collection is not None and collection.stamp == stamp:
+                return collection
+            try:
+                records = self._read_json_file(filepath)
+            except json.JSONDecodeError as e:
+                # 文件损坏时不能当作空列表，否则下一次写入会覆盖全部数据
+                if collection is None:
+                    raise
+                print(f"Error loading {filepath}, serving cached data: {e}")
+                return collection
+            collection = self._new_collection(filepath, records, stamp)
+            self._cache[filepath] = collection
+            return collection
+    
+    def _event_collection(self, filepath):
+        """读取事件日志集合
+
+        缓存的文件戳为 (inode, 已读取的字节数)。文件只被追加时只读取新增的
+        尾部事件；文件被压缩替换（inode变化）或截断时重新完整加载。
+        """
+        try:
+            st = os.stat(filepath)
+            ino, size = st.st_ino, st.st_size
+        except FileNotFoundError:
+            ino, size = None, 0
+        collection = self._cache.get(filepath)
+        if collection is not None and collection.stamp == (ino, size):
+            return collection
+        if collection is None or collection.stamp[0] != ino or size < collection.stamp[1]:
+            collection = self._new_collection(filepath, [], (ino, 0))
+            self._cache[filepath] = collection
+        entries, offset = self._read_jsonl_entries(filepath, collection.stamp[1])
+        for entry in entries:
+            self._apply_event(collection, entry)
+        collection.stamp = (ino, offset)
+        return collection
+    
+    @staticmethod
+    def _apply_event(collection, entry):
+        """将事件日志中的一行应用到集合"""
+        op = entry.get(EVENT_OP)
+        if op is None:
+            record = collection.get(entry.get('id'))
+            if record is None:
+                collection.add(entry)
+            else:
+                collection.update(record, entry)
+            return
+        
+        collection.events += 1
+        record = collection.get(entry.get('id'))
+        if record is None:
+            return
+        if op == 'push':
+            collection.push(record, entry['field'], entry['item'])
+        collection.update(record, entry.get('fields', {}))
+    
+    def _refresh_stamp(self, filepath, records):
+        """写入后刷新缓存：同一份记录只更新文件戳，保留已有索引"""
+        with self._cache_lock:
+            stamp = self._file_stamp(filepath)
+            collection = self._cache.get(filepath)
+            if collection is not None and collection.records is records:
+                collection.stamp = stamp
+            else:
+                self._cache[filepath] = self._new_collection(filepath, records, stamp)
+    
+    def invalidate_cache(self, filepath=None):
+        """清除缓存，未指定文件时清除全部"""
+        with self._cache_lock:
+            if filepath is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(filepath, None)
     
     def _read_json(self, filepath):
-        """读取JSON文件"""
+        """读取JSON文件（缓存）"""
+        return self._collection(filepath).records
+    
+    def _read_json_file(self, filepath):
+        """读取JSON文件，文件不存在时返回空列表"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(filepath, 'rb') as f:
+                return self.codec.loads(f.read())
+        except FileNotFoundError:
             return []
     
     def _write_json(self, filepath, data):
-        """写入JSON文件"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """原子写入JSON文件（默认紧凑格式，pretty_json 时缩进便于查看）
+
+        调用方持有该文件的锁；编码和写入期间不持有缓存锁，写入成功后再刷新缓存。
+        """
+        try:
+            payload = self.codec.dumps(data, pretty=self.pretty_json)
+            self._atomic_write(filepath, payload)
+        except Exception:
+            self.invalidate_cache(filepath)
+            raise
+        self._refresh_stamp(filepath, data)
     
     def _read_jsonl(self, filepath):
-        """读取JSONL文件"""
-        data = []
+        """读取JSONL文件（缓存）"""
+        return self._collection(filepath).records
+    
+    def _read_jsonl_entries(self, filepath, offset=0):
+        """从指定字节偏移读取完整的JSONL行，返回(数据, 新偏移)
+
+        末尾没有换行符的行可能仍在写入中，留到下次读取。
+        """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        data.append(json.loads(line))
+            with open(filepath, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
         except FileNotFoundError:
-            pass
-        return data
+            return [], 0
+        end = chunk.rfind(b'\n') + 1
+        entries, corrupt = loads_lines(self.codec, chunk[:end])
+        for e in corrupt:
+            # 崩溃时写了一半的行，跳过
+            print(f"Skipping corrupt line in {filepath}: {e}")
+        return entries, offset + end
+    
+    def _append_event(self, filepath, entry):
+        """向事件日志追加一行，并应用到缓存的集合"""
+        self._append_events(filepath, [entry])
     
-    def _append_jsonl(self, filepath, data):
-        """追加到JSONL文件"""
-        with open(filepath, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+    def _append_events(self, filepath, entries):
+        """向事件日志一次追加多行（一次加锁、一次写入），并应用到缓存的集合"""
+        payload = b''.join(self.codec.dumps(entry) + b'\n' for entry in entries)
+        with self._locked(filepath):
+            collection = self._collection(filepath)
+            ino, end = self._append_line(filepath, payload)
+            with self._cache_lock:
+                if (ino, end - len(payload)) == collection.stamp:
+                    for entry in entries:
+                        self._apply_event(collection, entry)
+                    collection.stamp = (ino, end)
+                elif collection.stamp != (ino, end):
+                    # 文件在读取后被外部修改（如未加锁的编辑），下次读取时从磁盘补齐；
+                    # 读到 (ino, end) 说明其他线程已从磁盘读取并应用了这些事件
+                    self.invalidate_cache(filepath)
+            
+            if collection.events >= max(self.compact_min_events, len(collection)):
+                self.compact(filepath)
     
-    def _update_jsonl(self, filepath, data_list):
-        """更新JSONL文件"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            for data in data_list:
-                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+    def compact(self, filepath=None):
+        """将事件日志压缩为只包含当前记录的快照，未指定文件时压缩全部"""
+        if filepath is None:
+            for path in (self.issues_file, self.tasks_file):
+                self.compact(path)
+            return
+        with self._locked(filepath):
+            collection = self._collection(filepath)
+            with self._cache_lock:
+                payload = b''.join(self.codec.dumps(data) + b'\n' for data in collection.records)
+            try:
+                self._atomic_write(filepath, payload)
+            except Exception:
+                self.invalidate_cache(filepath)
+                raise
+            st = os.stat(filepath)
+            with self._cache_lock:
+                collection.stamp = (st.st_ino, st.st_size)
+                collection.events = 0
+    
+    def bulk_insert(self, collection, records):
+        """批量新增记录（users / issues / tasks），返回 (新增条数, [(序号, 原因)])
+
+        整批只加一次锁、写一次文件：问题和任务一次追加全部事件行，用户整文件只重写一次。
+        与已有记录或同批记录的id、用户名重复的记录不写入，按在 records 中的序号返回原因。
+        """
+        filepath = self._bulk_files[collection]
+        unique_fields = ('id',) + self._unique_fields.get(filepath, ())
+        with self._locked(filepath):
+            current = self._collection(filepath)
+            seen = {field: set() for field in unique_fields}
+            accepted, rejected = [], []
+            for position, record in enumerate(records):
+                duplicate = next((field for field in unique_fields
+                                  if record.get(field) in seen[field]
+                                  or current.get(record.get(field), field=field) is not None),
+                                 None)
+                if duplicate is not None:
+                    rejected.append((position, f'{duplicate} 已存在: {record.get(duplicate)}'))
+                    continue
+                for field in unique_fields:
+                    seen[field].add(record.get(field))
+                accepted.append(record)
+            if accepted:
+                if filepath.endswith('.jsonl'):
+                    self._append_events(filepath, accepted)
+                else:
+                    with self._cache_lock:
+                        for record in accepted:
+                            current.add(record)
+                    self._write_json(filepath, current.records)
+        return len(accepted), rejected
     
     # 用户管理
     def get_all_users(self):
@@ -119,125 +576,146 @@ class DataManager:
                 continue
         return users
     
+    def _user_from_record(self, user):
+        if user is None:
+            return None
+        # 确保必要字段存在
+        if 'is_active' not in user:
+            user['is_active'] = True
+        return User.from_dict(user)
+    
+    def users_version(self):
+        """用户数据的版本号（用户文件戳），用户被增删改后改变，包括其他进程的修改"""
+        return self._collection(self.users_file).stamp
+    
     def get_user_by_id(self, user_id):
         """根据ID获取用户"""
-        users_data = self._read_json(self.users_file)
-        for user in users_data:
-            if user['id'] == user_id:
-                # 确保必要字段存在
-                if 'is_active' not in user:
-                    user['is_active'] = True
-                return User.from_dict(user)
-        return None
+        return self._user_from_record(self._collection(self.users_file).get(user_id))
     
     def get_user_by_username(self, username):
         """根据用户名获取用户"""
-        users_data = self._read_json(self.users_file)
-        for user in users_data:
-            if user['username'] == username:
-                # 确保必要字段存在
-                if 'is_active' not in user:
-                    user['is_active'] = True
-                return User.from_dict(user)
-        return None
+        return self._user_from_record(
+            self._collection(self.users_file).get(username, field='username'))
     
     def create_user(self, username, email, password, role, province=None, department=None):
         """创建用户"""
-        users_data = self._read_json(self.users_file)
-        new_user = {
-            'id': str(uuid.uuid4()),
-            'username': username,
-            'email': email,
-            'password_hash': generate_password_hash(password),
-            'role': role,
-            'province': province,
-            'department': department,
-            'created_at': datetime.now().isoformat(),
-            'is_active': True
-        }
-        users_data.append(new_user)
-        self._write_json(self.users_file, users_data)
-        return User.from_dict(new_user)
+        with self._locked(self.users_file):
+            users = self._collection(self.users_file)
+            new_user = {
+                'id': str(uuid.uuid4()),
+                'username': username,
+                'email': email,
+                'password_hash': generate_password_hash(password),
+                'role': role,
+                'province': province,
+                'department': department,
+                'created_at': datetime.now().isoformat(),
+                'is_active': True
+            }
+            with self._cache_lock:
+                users.add(new_user)
+            self._write_json(self.users_file, users.records)
+            return User.from_dict(new_user)
     
     def update_user(self, user_id, **kwargs):
         """更新用户"""
-        users_data = self._read_json(self.users_file)
-        for user in users_data:
-            if user['id'] == user_id:
-                # 更新所有提供的字段（不再检查是否已存在）
-                for key, value in kwargs.items():
-                    user[key] = value
-                # 确保关键字段存在
-                if 'is_active' not in user:
-                    user['is_active'] = True
-                self._write_json(self.users_file, users_data)
-                return True
-        return False
+        with self._locked(self.users_file):
+            users = self._collection(self.users_file)
+            user = users.get(user_id)
+            if user is None:
+                return False
+            # 更新所有提供的字段（不再检查是否已存在）
+            changes = dict(kwargs)
+            # 确保关键字段存在
+            if 'is_active' not in user and 'is_active' not in changes:
+                changes['is_active'] = True
+            with self._cache_lock:
+                users.update(user, changes)
+            self._write_json(self.users_file, users.records)
+            return True
     
     def delete_user(self, user_id):
         """删除用户"""
-        users_data = self._read_json(self.users_file)
-        users_data = [u for u in users_data if u['id'] != user_id]
-        self._write_json(self.users_file, users_data)
+        with self._locked(self.users_file):
+            users = self._collection(self.users_file)
+            with self._cache_lock:
+                users.remove(user_id)
+            self._write_json(self.users_file, users.records)
     
     # 角色管理
     def get_all_roles(self):
         """获取所有角色"""
-        return self._read_json(self.roles_file)
+        return list(self._read_json(self.roles_file))
     
     # 目标管理
     def get_all_objectives(self):
         """获取所有目标"""
-        return self._read_json(self.objectives_file)
+        return list(self._read_json(self.objectives_file))
     
     def create_objective(self, title, description, target_province, target_user, 
                         deadline, creator_id, parent_id=None):
         """创建目标"""
-        objectives = self._read_json(self.objectives_file)
-        new_objective = {
-            'id': str(uuid.uuid4()),
-            'title': title,
-            'description': description,
-            'target_province': target_province,
-            'target_user': target_user,
-            'deadline': deadline,
-            'creator_id': creator_id,
-            'parent_id': parent_id,
-            'status': 'pending',  # pending, in_progress, completed, overdue
-            'progress': 0,
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat(),
-            'sub_objectives': []
-        }
-        objectives.append(new_objective)
-        self._write_json(self.objectives_file, objectives)
-        return new_objective
+        with self._locked(self.objectives_file):
+            objectives = self._collection(self.objectives_file)
+            new_objective = {
+                'id': str(uuid.uuid4()),
+                'title': title,
+                'description': description,
+                'target_province': target_province,
+                'target_user': target_user,
+                'deadline': deadline,
+                'creator_id': creator_id,
+                'parent_id': parent_id,
+                'status': 'pending',  # pending, in_progress, completed, overdue
+                'progress': 0,
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat(),
+                'sub_objectives': []
+            }
+            with self._cache_lock:
+                objectives.add(new_objective)
+            self._write_json(self.objectives_file, objectives.records)
+            return new_objective
+    
+    @staticmethod
+    def _changes(record, kwargs):
+        """只保留记录中已存在的字段，并刷新更新时间"""
+        changes = {key: value for key, value in kwargs.items() if key in record}
+        changes['updated_at'] = datetime.now().isoformat()
+        return changes
     
     def update_objective(self, objective_id, **kwargs):
         """更新目标"""
-        objectives = self._read_json(self.objectives_file)
-        for obj in objectives:
-            if obj['id'] == objective_id:
-                for key, value in kwargs.items():
-                    if key in obj:
-                        obj[key] = value
-                obj['updated_at'] = datetime.now().isoformat()
-                self._write_json(self.objectives_file, objectives)
-                return True
-        return False
+        with self._locked(self.objectives_file):
+            objectives = self._collection(self.objectives_file)
+            obj = objectives.get(objective_id)
+            if obj is None:
+                return False
+            with self._cache_lock:
+                objectives.update(obj, self._changes(obj, kwargs))
+            self._write_json(self.objectives_file, objectives.records)
+            return True
     
     def get_objective_by_id(self, objective_id):
         """根据ID获取目标"""
-        objectives = self._read_json(self.objectives_file)
-        for obj in objectives:
-            if obj['id'] == objective_id:
-                return obj
-        return None
+        return self._collection(self.objectives_file).get(objective_id)
     
     # 问题反馈管理
     def get_all_issues(self):
         """获取所有问题"""
-        return self._read_jsonl(self.issues_file)
+        return list(self._read_jsonl(self.issues_file))
+    
+    def iter_issues(self, predicate=None, **filters):
+        """逐条返回满足条件的问题，如 next(iter_issues(province='广东', status='open'), None)
+
+        字段相等条件走二级索引，predicate(issue) 为其他条件；不复制记录，可以提前结束迭代。
+        """
+        with self._cache_lock:
+            return self._collection(self.issues_file).iter(predicate, **filters)
+    
+    def get_issue_by_id(self, issue_id):
+        """根据ID获取问题"""
+        return self._collection(self.issues_file).get(issue_id)
     
     def create_issue(self, title, description, category, priority, submitter_id, province):
         """创建问题"""
@@ -255,42 +733,54 @@ class DataManager:
             'updated_at': datetime.now().isoformat(),
             'comments': []
         }
-        self._append_jsonl(self.issues_file, new_issue)
+        self._append_event(self.issues_file, new_issue)
         return new_issue
     
     def update_issue(self, issue_id, **kwargs):
         """更新问题"""
-        issues = self._read_jsonl(self.issues_file)
-        for issue in issues:
-            if issue['id'] == issue_id:
-                for key, value in kwargs.items():
-                    if key in issue:
-                        issue[key] = value
-                issue['updated_at'] = datetime.now().isoformat()
-                self._update_jsonl(self.issues_file, issues)
-                return True
-        return False
+        with self._locked(self.issues_file):
+            issue = self.get_issue_by_id(issue_id)
+            if issue is None:
+                return False
+            self._append_event(self.issues_file, {
+                EVENT_OP: 'patch',
+                'id': issue_id,
+                'fields': self._changes(issue, kwargs)
+            })
+            return True
     
     def add_issue_comment(self, issue_id, user_id, comment):
         """添加问题评论"""
-        issues = self._read_jsonl(self.issues_file)
-        for issue in issues:
-            if issue['id'] == issue_id:
-                issue['comments'].append({
+        with self._locked(self.issues_file):
+            if self.get_issue_by_id(issue_id) is None:
+                return False
+            self._append_event(self.issues_file, {
+                EVENT_OP: 'push',
+                'id': issue_id,
+                'field': 'comments',
+                'item': {
                     'id': str(uuid.uuid4()),
                     'user_id': user_id,
                     'comment': comment,
                     'created_at': datetime.now().isoformat()
-                })
-                issue['updated_at'] = datetime.now().isoformat()
-                self._update_jsonl(self.issues_file, issues)
-                return True
-        return False
+                },
+                'fields': {'updated_at': datetime.now().isoformat()}
+            })
+            return True
     
     # 任务管理（工作流）
     def get_all_tasks(self):
         """获取所有任务"""
-        return self._read_jsonl(self.tasks_file)
+        return list(self._read_jsonl(self.tasks_file))
+    
+    def iter_tasks(self, predicate=None, **filters):
+        """逐条返回满足条件的任务，参数含义同 iter_issues"""
+        with self._cache_lock:
+            return self._collection(self.tasks_file).iter(predicate, **filters)
+    
+    def get_task_by_id(self, task_id):
+        """根据ID获取任务"""
+        return self._collection(self.tasks_file).get(task_id)
     
     def create_task(self, title, description, task_type, priority, creator_id, 
                     assigned_to=None, province=None):
@@ -311,79 +801,181 @@ class DataManager:
             'completed_at': None,
             'verified_at': None
         }
-        self._append_jsonl(self.tasks_file, new_task)
+        self._append_event(self.tasks_file, new_task)
         return new_task
     
     def update_task(self, task_id, **kwargs):
         """更新任务"""
-        tasks = self._read_jsonl(self.tasks_file)
-        for task in tasks:
-            if task['id'] == task_id:
-                for key, value in kwargs.items():
-                    if key in task:
-                        task[key] = value
-                task['updated_at'] = datetime.now().isoformat()
-                self._update_jsonl(self.tasks_file, tasks)
-                return True
-        return False
+        with self._locked(self.tasks_file):
+            task = self.get_task_by_id(task_id)
+            if task is None:
+                return False
+            self._append_event(self.tasks_file, {
+                EVENT_OP: 'patch',
+                'id': task_id,
+                'fields': self._changes(task, kwargs)
+            })
+            return True
     
     def add_task_log(self, task_id, user_id, log_content):
         """添加任务日志"""
-        tasks = self._read_jsonl(self.tasks_file)
-        for task in tasks:
-            if task['id'] == task_id:
-                task['logs'].append({
+        with self._locked(self.tasks_file):
+            if self.get_task_by_id(task_id) is None:
+                return False
+            self._append_event(self.tasks_file, {
+                EVENT_OP: 'push',
+                'id': task_id,
+                'field': 'logs',
+                'item': {
                     'id': str(uuid.uuid4()),
                     'user_id': user_id,
                     'content': log_content,
                     'created_at': datetime.now().isoformat()
-                })
-                task['updated_at'] = datetime.now().isoformat()
-                self._update_jsonl(self.tasks_file, tasks)
-                return True
-        return False
+                },
+                'fields': {'updated_at': datetime.now().isoformat()}
+            })
+            return True
     
     # 知识库管理
     def get_all_knowledge(self):
         """获取所有知识"""
-        return self._read_json(self.knowledge_file)
+        return list(self._read_json(self.knowledge_file))
+    
+    def get_knowledge_by_id(self, knowledge_id):
+        """根据ID获取知识"""
+        return self._collection(self.knowledge_file).get(knowledge_id)
+    
+    def _search_index(self):
+        """返回与知识库数据一致的全文索引（调用方持有索引锁）
+
+        首次使用时从磁盘加载；知识库文件被其他进程修改过时，只重新索引内容变化的文章。
+        缓存锁只在复制文章列表时短暂持有，计算内容哈希和切分在锁外进行。
+        """
+        if self._knowledge_index is None:
+            self._knowledge_index = SearchIndex.load(self.knowledge_index_file)
+        knowledge_list = self._collection(self.knowledge_file)
+        with self._cache_lock:
+            stamp = knowledge_list.stamp
+            if self._knowledge_index_stamp == stamp:
+                return self._knowledge_index
+            records = list(knowledge_list.records)
+        documents = {k['id']: knowledge_document(k) for k in records}
+        if self._knowledge_index.sync(documents):
+            self._index_saver.mark(self._knowledge_index)
+        self._knowledge_index_stamp = stamp
+        return self._knowledge_index
+    
+    def _save_search_index(self, snapshot):
+        self._atomic_write(self.knowledge_index_file, self.codec.dumps(snapshot))
+    
+    def _reindex_knowledge(self, stamp, knowledge_id=None, record=None):
+        """知识库写入后增量更新全文索引（调用方持有文件锁）
+
+        stamp 为写入前的文件戳，写入前索引不是最新的（或尚未加载）时留给下次搜索同步。
+        knowledge_id 为None表示没有影响检索的修改；record 为None表示文章已删除。
+        只持有索引锁，不阻塞其他线程读取缓存；索引文件由后台延迟保存。
+        """
+        with self._index_lock:
+            if self._knowledge_index is None or self._knowledge_index_stamp != stamp:
+                return
+            if knowledge_id is not None:
+                if record is None:
+                    self._knowledge_index.remove(knowledge_id)
+                else:
+                    self._knowledge_index.add(knowledge_id, knowledge_document(record))
+                self._index_saver.mark(self._knowledge_index)
+            self._knowledge_index_stamp = self._collection(self.knowledge_file).stamp
+    
+    def search_knowledge(self, text, category=None):
+        """全文搜索知识库，返回包含全部查询词的文章，按相关度（BM25）排序"""
+        with self._index_lock:
+            results = self._search_index().search(text)
+        knowledge_list = self._collection(self.knowledge_file)
+        with self._cache_lock:
+            articles = [knowledge_list.get(doc_id) for doc_id, _ in results]
+        return [k for k in articles
+                if k is not None and (category is None or k.get('category') == category)]
     
     def create_knowledge(self, title, content, category, author_id, tags=None):
         """创建知识"""
-        knowledge_list = self._read_json(self.knowledge_file)
-        new_knowledge = {
-            'id': str(uuid.uuid4()),
-            'title': title,
-            'content': content,
-            'category': category,
-            'author_id': author_id,
-            'tags': tags or [],
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat(),
-            'views': 0
-        }
-        knowledge_list.append(new_knowledge)
-        self._write_json(self.knowledge_file, knowledge_list)
-        return new_knowledge
+        with self._locked(self.knowledge_file):
+            knowledge_list = self._collection(self.knowledge_file)
+            stamp = knowledge_list.stamp
+            new_knowledge = {
+                'id': str(uuid.uuid4()),
+                'title': title,
+                'content': content,
+                'category': category,
+                'author_id': author_id,
+                'tags': tags or [],
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat(),
+                'views': 0
+            }
+            with self._cache_lock:
+                knowledge_list.add(new_knowledge)
+            self._write_json(self.knowledge_file, knowledge_list.records)
+            self._reindex_knowledge(stamp, new_knowledge['id'], new_knowledge)
+            return new_knowledge
     
     def update_knowledge(self, knowledge_id, **kwargs):
         """更新知识"""
-        knowledge_list = self._read_json(self.knowledge_file)
-        for knowledge in knowledge_list:
-            if knowledge['id'] == knowledge_id:
-                for key, value in kwargs.items():
-                    if key in knowledge:
-                        knowledge[key] = value
-                knowledge['updated_at'] = datetime.now().isoformat()
-                self._write_json(self.knowledge_file, knowledge_list)
-                return True
-        return False
+        with self._locked(self.knowledge_file):
+            knowledge_list = self._collection(self.knowledge_file)
+            knowledge = knowledge_list.get(knowledge_id)
+            if knowledge is None:
+                return False
+            stamp = knowledge_list.stamp
+            changes = self._changes(knowledge, kwargs)
+            with self._cache_lock:
+                knowledge_list.update(knowledge, changes)
+            self._write_json(self.knowledge_file, knowledge_list.records)
+            if any(field in changes for field in ('title', 'content', 'tags')):
+                self._reindex_knowledge(stamp, knowledge_id, knowledge)
+            else:
+                self._reindex_knowledge(stamp)
+            return True
     
     def delete_knowledge(self, knowledge_id):
         """删除知识"""
-        knowledge_list = self._read_json(self.knowledge_file)
-        knowledge_list = [k for k in knowledge_list if k['id'] != knowledge_id]
-        self._write_json(self.knowledge_file, knowledge_list)
+        with self._locked(self.knowledge_file):
+            knowledge_list = self._collection(self.knowledge_file)
+            stamp = knowledge_list.stamp
+            with self._cache_lock:
+                removed = knowledge_list.remove(knowledge_id)
+            if removed:
+                self._write_json(self.knowledge_file, knowledge_list.records)
+                self._reindex_knowledge(stamp, knowledge_id)
+    
+    def record_knowledge_view(self, knowledge_id):
+        """记录一次浏览，返回包括尚未写入部分在内的浏览次数"""
+        knowledge = self.get_knowledge_by_id(knowledge_id)
+        pending = self.knowledge_views.add(knowledge_id)
+        return (knowledge.get('views') or 0) + pending if knowledge else pending
+    
+    def _merge_knowledge_views(self, increments):
+        """把累计的浏览次数一次写入知识库，不修改 updated_at"""
+        with self._locked(self.knowledge_file):
+            knowledge_list = self._collection(self.knowledge_file)
+            stamp = knowledge_list.stamp
+            changed = False
+            with self._cache_lock:
+                for knowledge_id, n in increments.items():
+                    knowledge = knowledge_list.get(knowledge_id)
+                    if knowledge is not None:
+                        knowledge_list.update(knowledge, {'views': (knowledge.get('views') or 0) + n})
+                        changed = True
+            if changed:
+                self._write_json(self.knowledge_file, knowledge_list.records)
+                self._reindex_knowledge(stamp)
+    
+    def get_top_knowledge(self, limit=10):
+        """浏览次数最多的知识，浏览次数包括尚未写入的部分"""
+        pending = self.knowledge_views.pending()
+        views = lambda k: (k.get('views') or 0) + pending.get(k['id'], 0)
+        with self._cache_lock:
+            top = heapq.nlargest(limit, self._collection(self.knowledge_file).records, key=views)
+            return [dict(k, views=views(k)) for k in top]
     
     # 系统日志
     def add_system_log(self, user_id, action, details):
@@ -395,10 +987,24 @@ class DataManager:
             'details': details,
             'timestamp': datetime.now().isoformat()
         }
-        self._append_jsonl(self.logs_file, log_entry)
+        self.system_logs.append(log_entry)
     
-    def get_system_logs(self, limit=100):
-        """获取系统日志"""
-        logs = self._read_jsonl(self.logs_file)
-        return logs[-limit:] if len(logs) > limit else logs
+    def iter_logs(self, predicate=None, since=None, until=None, action=None, user_id=None):
+        """从新到旧逐条返回系统日志，从文件末尾按块读取，内存占用与日志量无关
+
+        since / until、action / user_id 含义同 get_system_logs，predicate(log) 为其他条件。
+        """
+        return self.system_logs.iter(since=since, until=until, action=action, user_id=user_id,
+                                     predicate=predicate)
+    
+    def get_system_logs(self, limit=100, cursor=None, since=None, until=None,
+                        action=None, user_id=None):
+        """获取系统日志：满足条件且在游标之前的最近 limit 条，按时间正序
+
+        since / until 为时间下限（含）和上限（不含），action / user_id 按操作和用户过滤。
+        """
+        # 从文件末尾倒序读取，不整体加载
+        position = decode_cursor(cursor) if cursor else None
+        return self.system_logs.read(limit=limit, before=position, since=since, until=until,
+                                     action=action, user_id=user_id)
 
@@ -0,0 +1,514 @@
+import os
+import json
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import tempfile
+import threading
+from itertools import groupby, islice
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from models.codec import get_codec
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只保留进程内的线程锁
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时使用 gzip
+    zstandard = None
+
+# 压缩方式 -> 冷段文件后缀
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# 写入模式: sync（请求内直接写）、batched（交给后台线程合并写入，等待写完再返回）、
+# async（放入队列立即返回，最多延迟 flush_interval 秒写入，进程崩溃时可能丢失）
+WRITE_MODES = ('sync', 'batched', 'async')
+
+
+def truncate_partial_line(f, filepath):
+    """追加前检查文件（以 a+b 打开，调用方持有写锁）是否以换行符结尾
+
+    上次写入中断（进程崩溃、磁盘写满）时末尾会留下不完整的一行，直接追加会把新行
+    接在后面，读取时整行被当作损坏跳过，新写入的数据随之丢失。这里截断到最后一个
+    换行符，返回截掉的字节数。
+    """
+    size = f.seek(0, os.SEEK_END)
+    if not size:
+        return 0
+    f.seek(size - 1)
+    if f.read(1) == b'\n':
+        return 0
+    end = size
+    while end > 0:
+        start = max(0, end - 65536)
+        f.seek(start)
+        newline = f.read(end - start).rfind(b'\n')
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    f.truncate(end)
+    print(f"Truncated {size - end} bytes of partial line at the end of {filepath}")
+    return size - end
+
+
+class _BatchWriter:
+    """后台写日志线程：从有界队列中取出日志，合并为一次写入
+
+    队列元素为 [日志, 完成事件, 异常]；日志为None的元素是 flush 标记。
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, store, flush_interval, queue_size):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        # fork 出的子进程不会继承线程，按 pid 判断是否需要重新启动
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self._run, name='system-log-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, entry, wait):
+        """放入一条日志；wait 为真时等待写入完成，写入失败时抛出异常"""
+        item = [entry, threading.Event() if wait else None, None]
+        # 队列满时阻塞，避免日志在内存中无限堆积
+        self.queue.put(item)
+        if wait:
+            item[1].wait()
+            if item[2] is not None:
+                raise item[2]
+
+    def flush(self):
+        """等待此前放入的日志全部写入"""
+        item = [None, threading.Event(), None]
+        self.queue.put(item)
+        item[1].wait()
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.BATCH_SIZE:
+            # 有调用方在等待时只合并已在队列中的日志，否则最多等待 flush_interval
+            waiting = any(item[1] is not None for item in batch)
+            timeout = 0 if waiting else deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            entries = [item[0] for item in batch if item[0] is not None]
+            error = None
+            if entries:
+                try:
+                    self.store.append_many(entries)
+                except Exception as e:
+                    print(f"Failed to write system logs: {e}")
+                    error = e
+            for item in batch:
+                if item[0] is not None:
+                    item[2] = error
+                if item[1] is not None:
+                    item[1].set()
+
+
+class SystemLogStore:
+    """系统日志的只追加 JSONL 存储
+
+    日志按时间顺序追加，文件往往是最大的数据文件，因此读取时不整体加载：
+    - 从文件末尾按块向前扫描，只解码需要返回的最后若干条
+    - 维护稀疏偏移索引：每隔 INDEX_STRIDE 字节记录一行的 (时间, 偏移)，
+      按时间范围查询时先用索引确定扫描区间，再在区间内倒序过滤
+    文件只会追加，索引随文件增长增量补齐；文件被替换或截断时重建。
+
+    写入始终追加到当前段 system_logs.jsonl。跨天（rotate_daily）或超过 max_bytes 时，
+    当前段改名为 system_logs-YYYYMMDD[-n].jsonl 归档，再在后台压缩为冷段；
+    manifest 文件记录各归档段的时间范围，读取时跨段进行并跳过范围外的段。
+    retention_days 大于0时删除最后一条日志早于保留期的归档段。
+    mode 为 batched / async 时日志交给后台线程批量写入，见 WRITE_MODES。
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    INDEX_STRIDE = 256 * 1024
+
+    def __init__(self, filepath, max_bytes=0, rotate_daily=False, compression='gzip',
+                 retention_days=0, mode='sync', flush_interval=0.5, queue_size=10000,
+                 locked=None, append_line=None, codec=None):
+        self.filepath = filepath
+        self.codec = codec or get_codec()
+        self.directory = os.path.dirname(filepath)
+        self.prefix = os.path.splitext(os.path.basename(filepath))[0]
+        self.manifest_file = os.path.join(self.directory, self.prefix + '.manifest.json')
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.retention_days = retention_days
+        if compression == 'zstd' and zstandard is None:
+            print('zstandard is not installed, compressing log segments with gzip')
+            compression = 'gzip'
+        self.compression = compression if compression in COMPRESSED_SUFFIXES else None
+        if mode not in WRITE_MODES:
+            raise ValueError(f'Unknown system log write mode: {mode}')
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        # 写锁和追加函数可由数据管理器提供，以便与其落盘策略、可重入锁保持一致
+        self._write_lock = threading.Lock()
+        self._locked = locked or self._file_lock
+        self._append_line = append_line or self._write_line
+        # (inode, 当前段首条日志的日期 YYYYMMDD)
+        self._active_day = (None, None)
+        self._lock = threading.Lock()
+        # [(时间, 行首偏移)]，时间递增
+        self._index = []
+        self._index_keys = []
+        # 下一个待采样的字节位置
+        self._indexed_to = 0
+        self._ino = None
+
+    @contextmanager
+    def _file_lock(self, filepath):
+        """默认写锁：进程内的线程锁 + 跨进程的 fcntl 文件锁"""
+        with self._write_lock:
+            fd = None
+            if fcntl is not None:
+                fd = os.open(filepath + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+
+    @staticmethod
+    def _write_line(filepath, line):
+        with open(filepath, 'a+b') as f:
+            truncate_partial_line(f, filepath)
+            f.write(line)
+
+    def _batch_writer(self):
+        """返回后台写线程，首次使用或 fork 后在当前进程中启动"""
+        with self._writer_lock:
+            if self._writer is None or self._writer.pid != os.getpid():
+                if self._writer is None:
+                    # 进程退出前把队列中的日志写完
+                    atexit.register(self.flush)
+                self._writer = _BatchWriter(self, self.flush_interval, self.queue_size)
+            return self._writer
+
+    def append(self, entry):
+        """按写入模式追加一条日志"""
+        if self.mode == 'sync':
+            self.append_many([entry])
+        else:
+            self._batch_writer().put(entry, wait=self.mode == 'batched')
+
+    def flush(self):
+        """等待后台队列中的日志全部写入文件"""
+        writer = self._writer
+        if writer is not None and writer.pid == os.getpid():
+            writer.flush()
+
+    def append_many(self, entries):
+        """在一次加锁内追加多条日志，每天的日志合并为一次写入，必要时先切分当前段"""
+        rotated = False
+        with self._locked(self.filepath):
+            for day, group in groupby(entries, key=lambda e: (e.get('timestamp') or '')[:10]):
+                payload = b''.join(self.codec.dumps(entry) + b'\n' for entry in group)
+                rotated = self._rotate_if_needed(day) or rotated
+                self._append_line(self.filepath, payload)
+        if rotated:
+            # 压缩和清理较慢，放到后台，不阻塞写入
+            threading.Thread(target=self.archive, daemon=True).start()
+
+    # 切分与归档
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'segments': []}
+
+    def _save_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=self.prefix + '.manifest.',
+                                        suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.manifest_file)
+
+    def _first_day(self, ino):
+        """当前段首条日志的日期 YYYYMMDD，按 inode 缓存"""
+        if self._active_day[0] != ino:
+            with open(self.filepath, 'rb') as f:
+                timestamp = self._timestamp(f.readline())
+            self._active_day = (ino, timestamp[:10].replace('-', '') if timestamp else None)
+        return self._active_day[1]
+
+    def _bounds(self):
+        """当前段首条和最后一条日志的时间"""
+        with open(self.filepath, 'rb') as f:
+            first = self._timestamp(f.readline())
+            last = None
+            for line in self._reverse_lines(f, 0, os.fstat(f.fileno()).st_size):
+                last = self._timestamp(line) if line.strip() else None
+                if last:
+                    break
+        return first, last
+
+    def _segment_name(self, day, manifest):
+        taken = {segment['file'] for segment in manifest['segments']}
+        name = f'{self.prefix}-{day}.jsonl'
+        n = 0
+        while name in taken or os.path.exists(os.path.join(self.directory, name)):
+            n += 1
+            name = f'{self.prefix}-{day}-{n}.jsonl'
+        return name
+
+    def _rotate_if_needed(self, timestamp):
+        """按日期或大小切分当前段，调用方需持有写锁；返回是否发生了切分"""
+        if not (self.max_bytes or self.rotate_daily):
+            return False
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return False
+        if not st.st_size:
+            return False
+        day = self._first_day(st.st_ino)
+        new_day = self.rotate_daily and day and timestamp[:10].replace('-', '') != day
+        if not (new_day or (self.max_bytes and st.st_size >= self.max_bytes)):
+            return False
+        first, last = self._bounds()
+        manifest = self._load_manifest()
+        name = self._segment_name(day or datetime.now().strftime('%Y%m%d'), manifest)
+        os.rename(self.filepath, os.path.join(self.directory, name))
+        manifest['segments'].append({'file': name, 'first': first, 'last': last,
+                                     'bytes': st.st_size, 'compression': None})
+        self._save_manifest(manifest)
+        return True
+
+    def _compress(self, name):
+        """把归档段压缩为冷段，并在 manifest 中登记"""
+        source = os.path.join(self.directory, name)
+        suffix = COMPRESSED_SUFFIXES[self.compression]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=name + '.', suffix='.tmp')
+        try:
+            with open(source, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                if self.compression == 'zstd':
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+                else:
+                    with gzip.GzipFile(fileobj=dst, mode='wb') as gz:
+                        shutil.copyfileobj(src, gz)
+            with self._locked(self.filepath):
+                manifest = self._load_manifest()
+                segment = next((s for s in manifest['segments'] if s['file'] == name), None)
+                if segment is None or segment.get('compression') is not None:
+                    # 已被其他进程压缩或清理
+                    return
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, source + suffix)
+                segment['compression'] = self.compression
+                self._save_manifest(manifest)
+            os.remove(source)
+        except FileNotFoundError:
+            pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _expire(self):
+        """删除超过保留期的归档段"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self._locked(self.filepath):
+            manifest = self._load_manifest()
+            expired = [s for s in manifest['segments'] if (s.get('last') or '') < cutoff]
+            if not expired:
+                return
+            manifest['segments'] = [s for s in manifest['segments'] if s not in expired]
+            self._save_manifest(manifest)
+        for segment in expired:
+            for suffix in [''] + list(COMPRESSED_SUFFIXES.values()):
+                try:
+                    os.remove(os.path.join(self.directory, segment['file'] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def archive(self):
+        """压缩尚未压缩的归档段，并删除过期的段"""
+        if self.compression:
+            for segment in self._load_manifest()['segments']:
+                if segment.get('compression') is None:
+                    self._compress(segment['file'])
+        if self.retention_days:
+            self._expire()
+
+    # 读取
+
+    def _timestamp(self, line):
+        try:
+            return self.codec.loads(line).get('timestamp')
+        except (ValueError, AttributeError):
+            return None
+
+    def _refresh_index(self, f):
+        """把稀疏索引补齐到文件当前末尾"""
+        st = os.fstat(f.fileno())
+        if st.st_ino != self._ino or st.st_size < self._indexed_to:
+            self._index, self._index_keys = [], []
+            self._indexed_to = 0
+            self._ino = st.st_ino
+        while self._indexed_to < st.st_size:
+            boundary = self._indexed_to
+            f.seek(max(0, boundary - 1))
+            if boundary:
+                # 跳到采样点之后的第一个行首
+                f.readline()
+            offset = f.tell()
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                # 尾部的行尚未写完，下次再采样
+                break
+            timestamp = self._timestamp(line)
+            if timestamp and (not self._index or
+                              (offset > self._index[-1][1] and timestamp >= self._index[-1][0])):
+                self._index.append((timestamp, offset))
+                self._index_keys.append(timestamp)
+            self._indexed_to = boundary + self.INDEX_STRIDE
+
+    def _scan_range(self, f, since, until):
+        """用稀疏索引确定需要扫描的 [start, end) 字节区间"""
+        with self._lock:
+            self._refresh_index(f)
+            start = 0
+            end = os.fstat(f.fileno()).st_size
+            if since is not None:
+                i = bisect_left(self._index_keys, since) - 1
+                if i >= 0:
+                    start = self._index[i][1]
+            if until is not None:
+                i = bisect_right(self._index_keys, until)
+                if i < len(self._index):
+                    end = self._index[i][1]
+        return start, end
+
+    def _reverse_lines(self, f, start, end):
+        """从 end 向 start 按块倒序产出各行
+
+        第一个产出的是 end 之后最后一个换行符后的片段（为空或是未写完的行），调用方应丢弃。
+        """
+        pending = b''
+        pos = end
+        while pos > start:
+            size = min(self.BLOCK_SIZE, pos - start)
+            pos -= size
+            f.seek(pos)
+            pieces = (f.read(size) + pending).split(b'\n')
+            # 块首的片段可能是半行，和前一块拼接后再产出
+            pending = pieces[0]
+            for piece in reversed(pieces[1:]):
+                yield piece
+        yield pending
+
+    def _segment_lines(self, segment):
+        """倒序产出归档段的各行；冷段整体解压后再倒序"""
+        path = os.path.join(self.directory, segment['file'])
+        compression = segment.get('compression')
+        if compression is None:
+            try:
+                with open(path, 'rb') as f:
+                    yield from self._reverse_lines(f, 0, os.fstat(f.fileno()).st_size)
+                return
+            except FileNotFoundError:
+                # manifest 读取之后被其他进程压缩了
+                compression = next((c for c, suffix in COMPRESSED_SUFFIXES.items()
+                                    if os.path.exists(path + suffix)), None)
+                if compression is None:
+                    return
+        try:
+            with open(path + COMPRESSED_SUFFIXES[compression], 'rb') as f:
+                if compression == 'zstd':
+                    data = zstandard.ZstdDecompressor().stream_reader(f).read()
+                else:
+                    data = gzip.GzipFile(fileobj=f, mode='rb').read()
+        except FileNotFoundError:
+            # 已过保留期被删除
+            return
+        yield from reversed(data.split(b'\n'))
+
+    def _matching(self, lines, match):
+        """从倒序的行中逐条产出满足条件的日志"""
+        for line in lines:
+            if not line or line == b'\r':
+                continue
+            try:
+                log = self.codec.loads(line)
+            except ValueError:
+                continue
+            if match(log):
+                yield log
+
+    def iter(self, before=None, since=None, until=None, action=None, user_id=None,
+             predicate=None):
+        """从新到旧逐条产出满足条件的日志，可跨越归档段
+
+        按块倒序读取，内存占用与文件大小无关；调用方取够后停止迭代即不再读取。
+        before: (时间, id)，只返回排在它之前的日志，用于游标分页
+        since / until: 时间下限（含）和上限（不含），ISO 格式字符串，可以只写日期
+        action / user_id: 按操作类型、用户过滤；predicate: 其他条件，返回真值的日志才产出
+        """
+        # 读到刚写入的日志
+        self.flush()
+        upper = until
+        if before is not None and (upper is None or before[0] < upper):
+            upper = before[0]
+
+        def match(log):
+            timestamp = log.get('timestamp') or ''
+            return ((since is None or timestamp >= since) and
+                    (until is None or timestamp < until) and
+                    (before is None or (timestamp, log.get('id') or '') < before) and
+                    (action is None or log.get('action') == action) and
+                    (user_id is None or log.get('user_id') == user_id) and
+                    (predicate is None or predicate(log)))
+
+        try:
+            f = open(self.filepath, 'rb')
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                start, end = self._scan_range(f, since, upper)
+                lines = self._reverse_lines(f, start, end)
+                # 丢弃末尾可能尚未写完的行
+                next(lines)
+                yield from self._matching(lines, match)
+        for segment in reversed(self._load_manifest()['segments']):
+            if upper is not None and (segment.get('first') or '') > upper:
+                continue
+            if since is not None and (segment.get('last') or '') < since:
+                break
+            yield from self._matching(self._segment_lines(segment), match)
+
+    def read(self, limit=100, before=None, since=None, until=None, action=None, user_id=None):
+        """返回满足条件的最近 limit 条日志，按时间正序，参数含义见 iter"""
+        logs = list(islice(self.iter(before, since, until, action, user_id), limit))
+        logs.reverse()
+        return logs
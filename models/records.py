@@ -0,0 +1,159 @@
+import sys
+from collections.abc import MutableMapping
+
+_MISSING = object()
+
+
+class Record(MutableMapping):
+    """常驻内存的紧凑记录
+
+    已知字段存放在 __slots__ 中，没有每条记录一份的 __dict__ 和重复的键字符串；
+    状态、优先级、省份等取值重复的字段使用 sys.intern，相同取值共用一个字符串。
+    未定义的字段存放在 _extra 中，因此 from_dict/to_dict 往返不丢失数据。
+
+    记录实现了 dict 的读写接口（record['status']、get、update、in 等），
+    现有代码和模板按字典使用即可；未赋值的字段与字典中不存在的键行为一致。
+    """
+
+    __slots__ = ('_extra',)
+    # 需要 intern 的字段
+    INTERNED = frozenset()
+    # 嵌套列表字段 -> 元素的记录类型
+    NESTED = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__slots__)
+        cls._field_set = frozenset(cls.FIELDS)
+
+    def __init__(self, data=()):
+        self._extra = None
+        for key, value in dict(data).items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        return data if isinstance(data, cls) else cls(data)
+
+    def to_dict(self):
+        """转换为普通字典（嵌套记录同样转换），用于序列化"""
+        result = {}
+        for key, value in self.items():
+            if key in self.NESTED and isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, Record) else item for item in value]
+            result[key] = value
+        return result
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            if key in self.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            elif key in self.NESTED and isinstance(value, list):
+                value = [self.NESTED[key].from_dict(item) if isinstance(item, dict) else item
+                         for item in value]
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return getattr(self, key, _MISSING) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def child(self, field, item):
+        """把要追加到嵌套列表字段的元素转换为对应的记录类型"""
+        item_type = self.NESTED.get(field)
+        return item_type.from_dict(item) if item_type and isinstance(item, dict) else item
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+# 外键（用户id）和枚举类字段取值高度重复
+_USER_REFS = ('submitter_id', 'assigned_to', 'creator_id', 'target_user', 'user_id', 'author_id')
+
+
+class Comment(Record):
+    """问题评论"""
+    __slots__ = ('id', 'user_id', 'comment', 'created_at')
+    INTERNED = frozenset(_USER_REFS)
+
+
+class TaskLog(Record):
+    """任务日志"""
+    __slots__ = ('id', 'user_id', 'content', 'created_at')
+    INTERNED = frozenset(_USER_REFS)
+
+
+class IssueRecord(Record):
+    __slots__ = ('id', 'title', 'description', 'category', 'priority', 'status',
+                 'submitter_id', 'province', 'assigned_to', 'created_at', 'updated_at',
+                 'comments')
+    INTERNED = frozenset(('category', 'priority', 'status', 'province') + _USER_REFS)
+    NESTED = {'comments': Comment}
+
+
+class TaskRecord(Record):
+    __slots__ = ('id', 'title', 'description', 'task_type', 'priority', 'status',
+                 'creator_id', 'assigned_to', 'province', 'created_at', 'updated_at',
+                 'logs', 'completed_at', 'verified_at')
+    INTERNED = frozenset(('task_type', 'priority', 'status', 'province') + _USER_REFS)
+    NESTED = {'logs': TaskLog}
+
+
+class ObjectiveRecord(Record):
+    __slots__ = ('id', 'title', 'description', 'target_province', 'target_user', 'deadline',
+                 'creator_id', 'parent_id', 'status', 'progress', 'created_at', 'updated_at',
+                 'sub_objectives')
+    INTERNED = frozenset(('target_province', 'status', 'deadline') + _USER_REFS)
+
+
+class UserRecord(Record):
+    __slots__ = ('id', 'username', 'email', 'password_hash', 'role', 'province',
+                 'department', 'created_at', 'is_active')
+    INTERNED = frozenset(('role', 'province', 'department'))
+
+
+def json_default(value):
+    """json.dumps 的 default 参数：把记录转换为字典"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import math
+import time
+import atexit
+import hashlib
+import threading
+
+# 没有分词边界的文字（中日韩汉字、日文假名）
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+# 连续的汉字/假名，或其他连续的非空白字符（字母、数字和 # . + - / 等符号，如 c#、.net）
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[^\\s{_CJK}]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+
+
+def _ngrams(text, n):
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def tokenize(text):
+    """把文本切分为索引词项
+
+    中文和日文假名没有分词边界，按单字和相邻二字切分；其他文字（英文、带重音的字母、
+    数字和符号）按单字符、二元组和三元组切分，使任意长度的查询词都可以匹配单词的一部分
+    （如 gu 匹配 gunicorn，db 匹配 mongodb，c# 和 .net 按原样匹配）。只忽略空白。
+    """
+    terms = []
+    for run in _TOKEN_RE.findall((text or '').lower()):
+        terms.extend(run)
+        terms.extend(_ngrams(run, 2))
+        if not _CJK_RE.match(run):
+            terms.extend(_ngrams(run, 3))
+    return terms
+
+
+def query_terms(text):
+    """把查询切分为词项，所有词项都命中的文档才算匹配
+
+    中文取相邻二字（单字查询取单字），其他文字不少于三个字符时取三元组，否则取查询词本身
+    （一两个字符，对应索引中的单字符和二元组）。
+    """
+    terms = []
+    for run in _TOKEN_RE.findall((text or '').lower()):
+        if _CJK_RE.match(run):
+            terms.extend(_ngrams(run, 2) if len(run) >= 2 else [run])
+        else:
+            terms.extend(_ngrams(run, 3) if len(run) >= 3 else [run])
+    return list(dict.fromkeys(terms))
+
+
+class SearchIndex:
+    """基于字符 n-gram 的倒排索引，按 BM25 排序
+
+    文档由若干字段组成，词频按 FIELD_WEIGHTS 加权后合并（标题命中比正文更重要）。
+    每个文档记录字段内容的哈希，sync 时只重新切分内容变化了的文档；
+    索引可以序列化为JSON保存，启动时加载后不必重新切分全部文档。
+    """
+
+    FIELD_WEIGHTS = {'title': 3, 'tags': 2, 'content': 1}
+    K1 = 1.2
+    B = 0.75
+    # 切分规则变化时递增，旧版本的索引文件加载后为空，由 sync 重建
+    VERSION = 3
+
+    def __init__(self):
+        # 文档id -> (内容哈希, {词项: 加权词频}, 加权长度)
+        self.docs = {}
+        # 词项 -> {文档id: 加权词频}
+        self.postings = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def fingerprint(fields):
+        payload = json.dumps(fields, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return hashlib.md5(payload).hexdigest()
+
+    def _insert(self, doc_id, digest, terms, length):
+        self.docs[doc_id] = (digest, terms, length)
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def add(self, doc_id, fields, digest=None):
+        """索引（或重新索引）一个文档，fields 为 {字段名: 文本}"""
+        self.remove(doc_id)
+        terms = {}
+        length = 0
+        for name, text in fields.items():
+            weight = self.FIELD_WEIGHTS.get(name, 1)
+            tokens = tokenize(text)
+            length += weight * len(tokens)
+            for term in tokens:
+                terms[term] = terms.get(term, 0) + weight
+        self._insert(doc_id, digest or self.fingerprint(fields), terms, length)
+
+    def remove(self, doc_id):
+        """从索引中删除文档"""
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc[2]
+        for term in doc[1]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def sync(self, documents):
+        """使索引与 {文档id: 字段} 一致，只处理新增、删除和内容变化的文档；返回是否有变化"""
+        changed = False
+        for doc_id in [doc_id for doc_id in self.docs if doc_id not in documents]:
+            self.remove(doc_id)
+            changed = True
+        for doc_id, fields in documents.items():
+            digest = self.fingerprint(fields)
+            doc = self.docs.get(doc_id)
+            if doc is None or doc[0] != digest:
+                self.add(doc_id, fields, digest)
+                changed = True
+        return changed
+
+    def search(self, query):
+        """返回包含全部查询词项的文档 [(文档id, 得分)]，按得分从高到低排列"""
+        terms = query_terms(query)
+        if not terms or not self.docs:
+            return []
+        postings = [self.postings.get(term) for term in terms]
+        if any(posting is None for posting in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        n = len(self.docs)
+        avg_length = self.total_length / n or 1
+        idf = [math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5)) for posting in postings]
+        results = []
+        for doc_id in candidates:
+            norm = self.K1 * (1 - self.B + self.B * self.docs[doc_id][2] / avg_length)
+            score = 0.0
+            for weight, posting in zip(idf, postings):
+                tf = posting[doc_id]
+                score += weight * tf * (self.K1 + 1) / (tf + norm)
+            results.append((doc_id, score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def to_dict(self):
+        return {
+            'version': self.VERSION,
+            'docs': {doc_id: [digest, terms, length]
+                     for doc_id, (digest, terms, length) in self.docs.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        if data.get('version') == cls.VERSION:
+            for doc_id, (digest, terms, length) in data.get('docs', {}).items():
+                index._insert(doc_id, digest, terms, length)
+        return index
+
+    @classmethod
+    def load(cls, filepath):
+        """从文件加载索引，文件不存在或损坏时返回空索引（之后由 sync 补齐）"""
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return cls()
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"Ignoring corrupt search index {filepath}: {e}")
+            return cls()
+
+
+class IndexSaver:
+    """全文索引的延迟保存
+
+    索引修改后只调用 mark() 标记，由后台线程每隔 interval 秒调用一次 save(快照) 写入文件，
+    进程退出时再写一次，连续编辑多篇文章只重写一次索引文件。快照在 lock 内用 to_dict()
+    取得（只复制文档表，各文档的词频表不会被原地修改），序列化和写文件不持有 lock。
+    进程异常退出时未保存的修改丢失，下次加载后由 sync 按内容哈希补齐。
+    """
+
+    def __init__(self, save, lock, interval=5.0):
+        self._save = save
+        self._index_lock = lock
+        self.interval = interval
+        self._pending = None
+        self._lock = threading.Lock()
+        # 保证先取的快照不会覆盖后取的快照
+        self._save_lock = threading.Lock()
+        # 后台线程所在的进程，fork 后在子进程中重新启动
+        self._pid = None
+        self._registered = False
+
+    def _ensure_thread(self):
+        # 调用方持有 self._lock
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='search-index-saver', daemon=True).start()
+        if not self._registered:
+            atexit.register(self.flush)
+            self._registered = True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Failed to save search index: {e}")
+
+    def mark(self, index):
+        """标记索引已修改，等待后台保存"""
+        with self._lock:
+            self._ensure_thread()
+            self._pending = index
+
+    def flush(self):
+        """立即保存已修改的索引，写入失败时保留标记，等待下次重试"""
+        with self._save_lock:
+            with self._lock:
+                index, self._pending = self._pending, None
+            if index is None:
+                return
+            with self._index_lock:
+                snapshot = index.to_dict()
+            try:
+                self._save(snapshot)
+            except Exception:
+                with self._lock:
+                    if self._pending is None:
+                        self._pending = index
+                raise
@@ -0,0 +1,775 @@
+import os
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from models.user import User
+from models.data_manager import encode_cursor, decode_cursor, knowledge_document
+from models.log_store import SystemLogStore
+from models.search_index import SearchIndex, IndexSaver
+from models.view_counter import ViewCounter
+from models.codec import get_codec
+
+# 表结构：表名 -> [(列名, 类型)]
+# 类型 json 表示以JSON文本存储的列表字段，bool 以 0/1 存储
+SCHEMA = {
+    'users': [
+        ('id', 'TEXT PRIMARY KEY'), ('username', 'TEXT UNIQUE NOT NULL'), ('email', 'TEXT'),
+        ('password_hash', 'TEXT'), ('role', 'TEXT'), ('province', 'TEXT'),
+        ('department', 'TEXT'), ('created_at', 'TEXT'), ('is_active', 'bool'),
+    ],
+    'roles': [
+        ('id', 'TEXT PRIMARY KEY'), ('name', 'TEXT'), ('permissions', 'json'),
+    ],
+    'objectives': [
+        ('id', 'TEXT PRIMARY KEY'), ('title', 'TEXT'), ('description', 'TEXT'),
+        ('target_province', 'TEXT'), ('target_user', 'TEXT'), ('deadline', 'TEXT'),
+        ('creator_id', 'TEXT'), ('parent_id', 'TEXT'), ('status', 'TEXT'),
+        ('progress', 'INTEGER'), ('created_at', 'TEXT'), ('updated_at', 'TEXT'),
+        ('sub_objectives', 'json'),
+    ],
+    'issues': [
+        ('id', 'TEXT PRIMARY KEY'), ('title', 'TEXT'), ('description', 'TEXT'),
+        ('category', 'TEXT'), ('priority', 'TEXT'), ('status', 'TEXT'),
+        ('submitter_id', 'TEXT'), ('province', 'TEXT'), ('assigned_to', 'TEXT'),
+        ('created_at', 'TEXT'), ('updated_at', 'TEXT'),
+    ],
+    'issue_comments': [
+        ('id', 'TEXT PRIMARY KEY'),
+        ('issue_id', 'TEXT NOT NULL REFERENCES issues(id) ON DELETE CASCADE'),
+        ('user_id', 'TEXT'), ('comment', 'TEXT'), ('created_at', 'TEXT'),
+    ],
+    'tasks': [
+        ('id', 'TEXT PRIMARY KEY'), ('title', 'TEXT'), ('description', 'TEXT'),
+        ('task_type', 'TEXT'), ('priority', 'TEXT'), ('status', 'TEXT'),
+        ('creator_id', 'TEXT'), ('assigned_to', 'TEXT'), ('province', 'TEXT'),
+        ('created_at', 'TEXT'), ('updated_at', 'TEXT'),
+        ('completed_at', 'TEXT'), ('verified_at', 'TEXT'),
+    ],
+    'task_logs': [
+        ('id', 'TEXT PRIMARY KEY'),
+        ('task_id', 'TEXT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE'),
+        ('user_id', 'TEXT'), ('content', 'TEXT'), ('created_at', 'TEXT'),
+    ],
+    'knowledge': [
+        ('id', 'TEXT PRIMARY KEY'), ('title', 'TEXT'), ('content', 'TEXT'),
+        ('category', 'TEXT'), ('author_id', 'TEXT'), ('tags', 'json'),
+        ('created_at', 'TEXT'), ('updated_at', 'TEXT'), ('views', 'INTEGER'),
+    ],
+}
+
+INDEXES = {
+    'objectives': ['target_user', 'target_province', 'status', 'created_at'],
+    'issues': ['province', 'assigned_to', 'submitter_id', 'status', 'created_at'],
+    'tasks': ['province', 'assigned_to', 'status', 'created_at'],
+    'issue_comments': ['issue_id'],
+    'task_logs': ['task_id'],
+    'knowledge': ['category', 'views'],
+}
+
+# 子表：父表 -> (子表, 外键列, 记录中的列表字段)
+CHILDREN = {
+    'issues': ('issue_comments', 'issue_id', 'comments'),
+    'tasks': ('task_logs', 'task_id', 'logs'),
+}
+
+# 批量导入时检查重复的唯一字段
+UNIQUE_FIELDS = {
+    'users': ('id', 'username'),
+    'issues': ('id',),
+    'tasks': ('id',),
+}
+
+
+def _column_type(col_type):
+    if col_type == 'json':
+        return 'TEXT'
+    if col_type == 'bool':
+        return 'INTEGER'
+    return col_type
+
+
+class SQLiteDataManager:
+    """基于SQLite的数据管理器，方法与 DataManager 保持一致
+
+    数据库使用WAL模式，允许多个读者与一个写者并发。每个线程持有独立的连接。
+    系统日志仍写入数据目录下的 system_logs.jsonl，log_options 为其切分归档参数。
+    """
+
+    # iter_issues / iter_tasks 每次从数据库读取的行数
+    ITER_BATCH = 500
+
+    def __init__(self, data_dir, db_path=None, log_options=None, views_flush_interval=10.0,
+                 codec=None, index_save_interval=5.0):
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, 'sysdemo.db')
+        # 列表字段（json列）、系统日志和索引文件的编解码器，与 DataManager 相同
+        self.codec = get_codec(codec)
+        self.logs_file = os.path.join(data_dir, 'system_logs.jsonl')
+        self.system_logs = SystemLogStore(self.logs_file, codec=self.codec, **(log_options or {}))
+        # 知识库全文索引，与 DataManager 相同的格式，可以删除，下次搜索时重建
+        self.knowledge_index_file = os.path.join(data_dir, 'knowledge.index.json')
+        self._knowledge_index = None
+        self._knowledge_index_stamp = None
+        self._index_lock = threading.RLock()
+        self._index_saver = IndexSaver(self._save_search_index, self._index_lock, index_save_interval)
+        self.knowledge_views = ViewCounter(self._merge_knowledge_views, views_flush_interval)
+        self._local = threading.local()
+        self._columns = {table: {name: col_type for name, col_type in cols}
+                         for table, cols in SCHEMA.items()}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # fork 出的子进程（如 gunicorn --preload 的工作进程）不能沿用父进程的连接
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def init_data(self):
+        """初始化数据库表和默认数据"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            for table, cols in SCHEMA.items():
+                columns = ', '.join(f'{name} {_column_type(col_type)}' for name, col_type in cols)
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+            for table, fields in INDEXES.items():
+                for field in fields:
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{field} '
+                                 f'ON {table} ({field})')
+            # 用户表的版本号：任何增删改（包括其他进程和迁移脚本）都由触发器加一，
+            # 供登录用户缓存判断是否失效
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('users_version', 0)")
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'CREATE TRIGGER IF NOT EXISTS users_version_{event.lower()} '
+                             f'AFTER {event} ON users BEGIN '
+                             f"UPDATE meta SET value = value + 1 WHERE key = 'users_version'; END")
+
+        # 多个工作进程同时启动时，由写锁保证默认数据只插入一次
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0:
+                self._insert('users', {
+                    'id': str(uuid.uuid4()),
+                    'username': 'admin',
+                    'email': 'admin@sysdemo.com',
+                    'password_hash': generate_password_hash('admin123'),
+                    'role': 'admin',
+                    'province': None,
+                    'department': '系统管理部',
+                    'created_at': datetime.now().isoformat(),
+                    'is_active': True
+                }, conn=conn)
+
+            if conn.execute('SELECT COUNT(*) FROM roles').fetchone()[0] == 0:
+                for role in [
+                    {'id': 'admin', 'name': '系统管理员', 'permissions': ['all']},
+                    {'id': 'province_manager', 'name': '省级管理员',
+                     'permissions': ['view_all', 'manage_province', 'create_objective', 'assign_task']},
+                    {'id': 'staff', 'name': '普通员工',
+                     'permissions': ['view_own', 'report_progress', 'submit_issue', 'view_knowledge']},
+                ]:
+                    self._insert('roles', role, conn=conn)
+
+        if not os.path.exists(self.logs_file):
+            open(self.logs_file, 'w').close()
+
+    def invalidate_cache(self, filepath=None):
+        """与 DataManager 保持一致，SQLite无需缓存失效"""
+
+    def compact(self, filepath=None):
+        """与 DataManager 保持一致，压缩数据库文件"""
+        self._conn().execute('VACUUM')
+
+    # 行与记录转换
+    def _encode(self, table, record):
+        row = {}
+        for name, col_type in self._columns[table].items():
+            if name not in record:
+                continue
+            value = record[name]
+            if col_type == 'json':
+                value = self.codec.dumps(value if value is not None else []).decode('utf-8')
+            elif col_type == 'bool':
+                value = 1 if value else 0
+            row[name] = value
+        return row
+
+    def _decode(self, table, row):
+        record = {}
+        for name, col_type in self._columns[table].items():
+            value = row[name]
+            if col_type == 'json':
+                value = self.codec.loads(value) if value else []
+            elif col_type == 'bool':
+                value = bool(value) if value is not None else True
+            record[name] = value
+        return record
+
+    def _insert(self, table, record, conn=None, replace=False):
+        row = self._encode(table, record)
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        sql = f'{verb} INTO {table} ({columns}) VALUES ({placeholders})'
+        if conn is not None:
+            conn.execute(sql, list(row.values()))
+        else:
+            with self._conn() as c:
+                c.execute(sql, list(row.values()))
+
+    def _update(self, table, record_id, changes):
+        row = self._encode(table, changes)
+        row.pop('id', None)
+        if not row:
+            return self._get(table, record_id) is not None
+        assignments = ', '.join(f'{name} = ?' for name in row)
+        with self._conn() as conn:
+            cursor = conn.execute(f'UPDATE {table} SET {assignments} WHERE id = ?',
+                                  list(row.values()) + [record_id])
+        return cursor.rowcount > 0
+
+    def _select(self, table, where='', params=()):
+        sql = f'SELECT * FROM {table}'
+        if where:
+            sql += f' WHERE {where}'
+        rows = self._conn().execute(sql, params).fetchall()
+        records = [self._decode(table, row) for row in rows]
+        if table in CHILDREN:
+            self._attach_children(table, records, all_rows=not where)
+        return records
+
+    def _where(self, collection, filters):
+        """把相等条件转换为 WHERE 子句和参数"""
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if field not in self._columns[collection]:
+                raise ValueError(f'Unknown field for {collection}: {field}')
+            clauses.append(f'{field} IS ?')
+            params.append(value)
+        return clauses, params
+
+    def query(self, collection, **filters):
+        """按字段相等条件查询集合，与 DataManager.query 一致，条件列走索引"""
+        clauses, params = self._where(collection, filters)
+        return self._select(collection, ' AND '.join(clauses), params)
+
+    def _iter(self, collection, predicate, filters):
+        """按条件逐批读取记录的迭代器，每批 ITER_BATCH 行，评论/工作日志按批加载"""
+        clauses, params = self._where(collection, filters)
+        sql = f'SELECT * FROM {collection}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        cursor = self._conn().execute(sql + ' ORDER BY rowid', params)
+
+        def records():
+            while True:
+                rows = cursor.fetchmany(self.ITER_BATCH)
+                if not rows:
+                    return
+                batch = [self._decode(collection, row) for row in rows]
+                if collection in CHILDREN:
+                    self._attach_children(collection, batch)
+                for record in batch:
+                    if predicate is None or predicate(record):
+                        yield record
+
+        return records()
+
+    def paginate(self, collection, cursor=None, limit=20, **filters):
+        """按 (created_at, id) 倒序的游标分页，与 DataManager.paginate 一致"""
+        clauses, params = self._where(collection, filters)
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            clauses.append('(created_at < ? OR (created_at = ? AND id < ?))')
+            params += [position[0], position[0], position[1]]
+        where = ' AND '.join(clauses) or '1'
+        rows = self._select(collection, f'{where} ORDER BY created_at DESC, id DESC LIMIT ?',
+                            params + [limit + 1])
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def count_by(self, collection, field, **scope):
+        """按字段分组计数，与 DataManager.count_by 一致，范围条件走索引"""
+        for name in [field, *scope]:
+            if name not in self._columns[collection]:
+                raise ValueError(f'Unknown field for {collection}: {name}')
+        sql = f'SELECT {field}, COUNT(*) FROM {collection}'
+        if scope:
+            sql += ' WHERE ' + ' AND '.join(f'{name} IS ?' for name in scope)
+        sql += f' GROUP BY {field} ORDER BY MIN(rowid)'
+        rows = self._conn().execute(sql, list(scope.values())).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def data_version(self, *collections):
+        """返回数据版本标识，与 DataManager.data_version 一致
+
+        WAL模式下每次提交都会修改 -wal 文件，检查点会修改主库文件，
+        两者的 mtime/size 合起来可以标识数据是否变化。
+        """
+        stamps = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                st = os.stat(path)
+                stamps.append(f'{st.st_mtime_ns}-{st.st_size}')
+            except FileNotFoundError:
+                stamps.append('-')
+        return ':'.join(stamps)
+
+    def rebuild_counters(self):
+        """与 DataManager 保持一致，SQLite的计数实时查询，无需重建"""
+
+    def _get(self, table, record_id):
+        records = self._select(table, 'id = ?', (record_id,))
+        return records[0] if records else None
+
+    def _attach_children(self, table, records, all_rows=False):
+        """加载评论/工作日志子表并挂到父记录上"""
+        child_table, foreign_key, field = CHILDREN[table]
+        by_id = {record['id']: record for record in records}
+        for record in records:
+            record[field] = []
+        if not records:
+            return
+        conn = self._conn()
+        if all_rows:
+            rows = conn.execute(f'SELECT * FROM {child_table} ORDER BY rowid').fetchall()
+        else:
+            rows = []
+            ids = list(by_id)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                rows.extend(conn.execute(
+                    f'SELECT * FROM {child_table} WHERE {foreign_key} IN ({placeholders}) '
+                    f'ORDER BY rowid', chunk).fetchall())
+        for row in rows:
+            parent = by_id.get(row[foreign_key])
+            if parent is not None:
+                item = self._decode(child_table, row)
+                del item[foreign_key]
+                parent[field].append(item)
+
+    def _add_child(self, table, parent_id, item):
+        child_table, foreign_key, field = CHILDREN[table]
+        with self._conn() as conn:
+            if conn.execute(f'SELECT 1 FROM {table} WHERE id = ?', (parent_id,)).fetchone() is None:
+                return False
+            self._insert(child_table, dict(item, **{foreign_key: parent_id}), conn=conn)
+            conn.execute(f'UPDATE {table} SET updated_at = ? WHERE id = ?',
+                         (datetime.now().isoformat(), parent_id))
+        return True
+
+    def _changes(self, table, kwargs):
+        """只保留表中存在的字段，并刷新更新时间"""
+        changes = {key: value for key, value in kwargs.items() if key in self._columns[table]}
+        changes['updated_at'] = datetime.now().isoformat()
+        return changes
+
+    def bulk_insert(self, collection, records):
+        """与 DataManager 保持一致：整批在一个事务中写入，返回 (新增条数, [(序号, 原因)])"""
+        unique_fields = UNIQUE_FIELDS[collection]
+        seen = {field: set() for field in unique_fields}
+        inserted, rejected = 0, []
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for position, record in enumerate(records):
+                duplicate = next((field for field in unique_fields
+                                  if record.get(field) in seen[field]
+                                  or conn.execute(f'SELECT 1 FROM {collection} WHERE {field} = ?',
+                                                  (record.get(field),)).fetchone()),
+                                 None)
+                if duplicate is not None:
+                    rejected.append((position, f'{duplicate} 已存在: {record.get(duplicate)}'))
+                    continue
+                for field in unique_fields:
+                    seen[field].add(record.get(field))
+                self._insert(collection, record, conn=conn)
+                if collection in CHILDREN:
+                    child_table, foreign_key, field = CHILDREN[collection]
+                    for item in record.get(field) or []:
+                        self._insert(child_table, dict(item, **{foreign_key: record['id']}),
+                                     conn=conn)
+                inserted += 1
+        return inserted, rejected
+
+    # 用户管理
+    def get_all_users(self):
+        """获取所有用户"""
+        return [User.from_dict(u) for u in self._select('users')]
+
+    def users_version(self):
+        """用户数据的版本号，用户被增删改后改变"""
+        return self._conn().execute(
+            "SELECT value FROM meta WHERE key = 'users_version'").fetchone()[0]
+
+    def get_user_by_id(self, user_id):
+        """根据ID获取用户"""
+        user = self._get('users', user_id)
+        return User.from_dict(user) if user else None
+
+    def get_user_by_username(self, username):
+        """根据用户名获取用户"""
+        users = self._select('users', 'username = ?', (username,))
+        return User.from_dict(users[0]) if users else None
+
+    def create_user(self, username, email, password, role, province=None, department=None):
+        """创建用户"""
+        new_user = {
+            'id': str(uuid.uuid4()),
+            'username': username,
+            'email': email,
+            'password_hash': generate_password_hash(password),
+            'role': role,
+            'province': province,
+            'department': department,
+            'created_at': datetime.now().isoformat(),
+            'is_active': True
+        }
+        self._insert('users', new_user)
+        return User.from_dict(new_user)
+
+    def update_user(self, user_id, **kwargs):
+        """更新用户"""
+        return self._update('users', user_id, kwargs)
+
+    def delete_user(self, user_id):
+        """删除用户"""
+        with self._conn() as conn:
+            conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+
+    # 角色管理
+    def get_all_roles(self):
+        """获取所有角色"""
+        return self._select('roles')
+
+    # 目标管理
+    def get_all_objectives(self):
+        """获取所有目标"""
+        return self._select('objectives')
+
+    def create_objective(self, title, description, target_province, target_user,
+                         deadline, creator_id, parent_id=None):
+        """创建目标"""
+        new_objective = {
+            'id': str(uuid.uuid4()),
+            'title': title,
+            'description': description,
+            'target_province': target_province,
+            'target_user': target_user,
+            'deadline': deadline,
+            'creator_id': creator_id,
+            'parent_id': parent_id,
+            'status': 'pending',
+            'progress': 0,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'sub_objectives': []
+        }
+        self._insert('objectives', new_objective)
+        return new_objective
+
+    def update_objective(self, objective_id, **kwargs):
+        """更新目标"""
+        return self._update('objectives', objective_id, self._changes('objectives', kwargs))
+
+    def get_objective_by_id(self, objective_id):
+        """根据ID获取目标"""
+        return self._get('objectives', objective_id)
+
+    # 问题反馈管理
+    def get_all_issues(self):
+        """获取所有问题"""
+        return self._select('issues')
+
+    def iter_issues(self, predicate=None, **filters):
+        """逐条返回满足条件的问题，与 DataManager.iter_issues 一致，相等条件在SQL中过滤"""
+        return self._iter('issues', predicate, filters)
+
+    def get_issue_by_id(self, issue_id):
+        """根据ID获取问题"""
+        return self._get('issues', issue_id)
+
+    def create_issue(self, title, description, category, priority, submitter_id, province):
+        """创建问题"""
+        new_issue = {
+            'id': str(uuid.uuid4()),
+            'title': title,
+            'description': description,
+            'category': category,
+            'priority': priority,
+            'status': 'open',
+            'submitter_id': submitter_id,
+            'province': province,
+            'assigned_to': None,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'comments': []
+        }
+        self._insert('issues', new_issue)
+        return new_issue
+
+    def update_issue(self, issue_id, **kwargs):
+        """更新问题"""
+        return self._update('issues', issue_id, self._changes('issues', kwargs))
+
+    def add_issue_comment(self, issue_id, user_id, comment):
+        """添加问题评论"""
+        return self._add_child('issues', issue_id, {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'comment': comment,
+            'created_at': datetime.now().isoformat()
+        })
+
+    # 任务管理（工作流）
+    def get_all_tasks(self):
+        """获取所有任务"""
+        return self._select('tasks')
+
+    def iter_tasks(self, predicate=None, **filters):
+        """逐条返回满足条件的任务，与 DataManager.iter_tasks 一致"""
+        return self._iter('tasks', predicate, filters)
+
+    def get_task_by_id(self, task_id):
+        """根据ID获取任务"""
+        return self._get('tasks', task_id)
+
+    def create_task(self, title, description, task_type, priority, creator_id,
+                    assigned_to=None, province=None):
+        """创建任务"""
+        new_task = {
+            'id': str(uuid.uuid4()),
+            'title': title,
+            'description': description,
+            'task_type': task_type,
+            'priority': priority,
+            'status': 'pending',
+            'creator_id': creator_id,
+            'assigned_to': assigned_to,
+            'province': province,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'logs': [],
+            'completed_at': None,
+            'verified_at': None
+        }
+        self._insert('tasks', new_task)
+        return new_task
+
+    def update_task(self, task_id, **kwargs):
+        """更新任务"""
+        return self._update('tasks', task_id, self._changes('tasks', kwargs))
+
+    def add_task_log(self, task_id, user_id, log_content):
+        """添加任务日志"""
+        return self._add_child('tasks', task_id, {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'content': log_content,
+            'created_at': datetime.now().isoformat()
+        })
+
+    # 知识库管理
+    def get_all_knowledge(self):
+        """获取所有知识"""
+        return self._select('knowledge')
+
+    def get_knowledge_by_id(self, knowledge_id):
+        """根据ID获取知识"""
+        return self._get('knowledge', knowledge_id)
+
+    def _knowledge_stamp(self):
+        """知识库表的变更标识：文章数和最后更新时间"""
+        return tuple(self._conn().execute(
+            'SELECT COUNT(*), MAX(updated_at) FROM knowledge').fetchone())
+
+    def _search_index(self):
+        """返回与知识库表一致的全文索引，表被其他进程修改过时只重新索引变化的文章"""
+        with self._index_lock:
+            if self._knowledge_index is None:
+                self._knowledge_index = SearchIndex.load(self.knowledge_index_file)
+            stamp = self._knowledge_stamp()
+            if self._knowledge_index_stamp != stamp:
+                rows = self._conn().execute('SELECT id, title, tags, content FROM knowledge')
+                documents = {row['id']: knowledge_document({
+                    'title': row['title'],
+                    'content': row['content'],
+                    'tags': self.codec.loads(row['tags']) if row['tags'] else [],
+                }) for row in rows}
+                if self._knowledge_index.sync(documents):
+                    self._index_saver.mark(self._knowledge_index)
+                self._knowledge_index_stamp = stamp
+            return self._knowledge_index
+
+    def _save_search_index(self, snapshot):
+        tmp_path = f'{self.knowledge_index_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.codec.dumps(snapshot))
+        os.replace(tmp_path, self.knowledge_index_file)
+
+    def _reindex_knowledge(self, stamp, knowledge_id=None, record=None):
+        """写入后增量更新全文索引，参数含义与 DataManager._reindex_knowledge 相同"""
+        if self._knowledge_index is None or self._knowledge_index_stamp != stamp:
+            return
+        if knowledge_id is not None:
+            if record is None:
+                self._knowledge_index.remove(knowledge_id)
+            else:
+                self._knowledge_index.add(knowledge_id, knowledge_document(record))
+            self._index_saver.mark(self._knowledge_index)
+        self._knowledge_index_stamp = self._knowledge_stamp()
+
+    def search_knowledge(self, text, category=None):
+        """全文搜索知识库，与 DataManager.search_knowledge 一致"""
+        with self._index_lock:
+            ids = [doc_id for doc_id, _ in self._search_index().search(text)]
+        by_id = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            for record in self._select('knowledge', f'id IN ({placeholders})', chunk):
+                by_id[record['id']] = record
+        articles = [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+        return [k for k in articles if category is None or k.get('category') == category]
+
+    def create_knowledge(self, title, content, category, author_id, tags=None):
+        """创建知识"""
+        new_knowledge = {
+            'id': str(uuid.uuid4()),
+            'title': title,
+            'content': content,
+            'category': category,
+            'author_id': author_id,
+            'tags': tags or [],
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'views': 0
+        }
+        with self._index_lock:
+            stamp = self._knowledge_stamp()
+            self._insert('knowledge', new_knowledge)
+            self._reindex_knowledge(stamp, new_knowledge['id'], new_knowledge)
+        return new_knowledge
+
+    def update_knowledge(self, knowledge_id, **kwargs):
+        """更新知识"""
+        changes = self._changes('knowledge', kwargs)
+        with self._index_lock:
+            stamp = self._knowledge_stamp()
+            updated = self._update('knowledge', knowledge_id, changes)
+            if updated and any(field in changes for field in ('title', 'content', 'tags')):
+                self._reindex_knowledge(stamp, knowledge_id, self._get('knowledge', knowledge_id))
+            elif updated:
+                self._reindex_knowledge(stamp)
+        return updated
+
+    def delete_knowledge(self, knowledge_id):
+        """删除知识"""
+        with self._index_lock:
+            stamp = self._knowledge_stamp()
+            with self._conn() as conn:
+                deleted = conn.execute('DELETE FROM knowledge WHERE id = ?', (knowledge_id,)).rowcount
+            if deleted:
+                self._reindex_knowledge(stamp, knowledge_id)
+
+    def record_knowledge_view(self, knowledge_id):
+        """记录一次浏览，与 DataManager.record_knowledge_view 一致"""
+        knowledge = self.get_knowledge_by_id(knowledge_id)
+        pending = self.knowledge_views.add(knowledge_id)
+        return (knowledge.get('views') or 0) + pending if knowledge else pending
+
+    def _merge_knowledge_views(self, increments):
+        """在一个事务中累加浏览次数，不修改 updated_at"""
+        with self._conn() as conn:
+            conn.executemany('UPDATE knowledge SET views = COALESCE(views, 0) + ? WHERE id = ?',
+                             [(n, knowledge_id) for knowledge_id, n in increments.items()])
+
+    def get_top_knowledge(self, limit=10):
+        """浏览次数最多的知识，先写入累计的浏览次数再按索引列排序"""
+        self.knowledge_views.flush()
+        return self._select('knowledge', '1 ORDER BY views DESC LIMIT ?', [limit])
+
+    # 系统日志
+    def add_system_log(self, user_id, action, details):
+        """添加系统日志"""
+        log_entry = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.system_logs.append(log_entry)
+
+    def iter_logs(self, predicate=None, since=None, until=None, action=None, user_id=None):
+        """从新到旧逐条返回系统日志，与 DataManager.iter_logs 一致"""
+        return self.system_logs.iter(since=since, until=until, action=action, user_id=user_id,
+                                     predicate=predicate)
+
+    def get_system_logs(self, limit=100, cursor=None, since=None, until=None,
+                        action=None, user_id=None):
+        """获取系统日志：满足条件且在游标之前的最近 limit 条，按时间正序
+
+        since / until 为时间下限（含）和上限（不含），action / user_id 按操作和用户过滤。
+        """
+        position = decode_cursor(cursor) if cursor else None
+        return self.system_logs.read(limit=limit, before=position, since=since, until=until,
+                                     action=action, user_id=user_id)
+
+
+def migrate_json_to_sqlite(data_dir, db_path=None):
+    """将JSON/JSONL数据一次性导入SQLite，返回各表导入的记录数
+
+    已存在的同ID记录会被覆盖，可重复执行。
+    """
+    from models.data_manager import DataManager
+
+    source = DataManager(data_dir)
+    target = SQLiteDataManager(data_dir, db_path)
+    target.init_data()
+
+    counts = {}
+    conn = target._conn()
+    with conn:
+        users = source._read_json(source.users_file)
+        if users:
+            # 默认管理员由 init_data 创建，导入时以JSON中的用户为准
+            conn.execute('DELETE FROM users')
+        for user in users:
+            target._insert('users', user, conn=conn, replace=True)
+        counts['users'] = len(users)
+
+        roles = source.get_all_roles()
+        for role in roles:
+            target._insert('roles', role, conn=conn, replace=True)
+        counts['roles'] = len(roles)
+
+        for table, records in [
+            ('objectives', source.get_all_objectives()),
+            ('issues', source.get_all_issues()),
+            ('tasks', source.get_all_tasks()),
+            ('knowledge', source.get_all_knowledge()),
+        ]:
+            for record in records:
+                target._insert(table, record, conn=conn, replace=True)
+                if table in CHILDREN:
+                    child_table, foreign_key, field = CHILDREN[table]
+                    conn.execute(f'DELETE FROM {child_table} WHERE {foreign_key} = ?',
+                                 (record['id'],))
+                    for item in record.get(field) or []:
+                        target._insert(child_table, dict(item, **{foreign_key: record['id']}),
+                                       conn=conn, replace=True)
+            counts[table] = len(records)
+    return counts
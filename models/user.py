@@ -1,7 +1,14 @@
-from flask_login import UserMixin
 from datetime import datetime
 
-class User(UserMixin):
+class User:
+    """登录用户
+
+    使用 __slots__，不继承 flask_login.UserMixin（UserMixin 没有 __slots__，
+    继承后实例仍带 __dict__），Flask-Login 需要的属性和方法在这里实现。
+    """
+    __slots__ = ('id', 'username', 'email', 'password_hash', 'role', 'province',
+                 'department', 'created_at', '_is_active')
+    
     def __init__(self, user_id, username, email, password_hash, role, province=None, 
                  department=None, created_at=None, is_active=True):
         self.id = user_id
@@ -16,9 +23,31 @@ class User(UserMixin):
     
     @property
     def is_active(self):
-        """重写UserMixin的is_active属性"""
+        """账号是否启用，停用的账号不能登录"""
         return self._is_active
     
+    @property
+    def is_authenticated(self):
+        # 与 UserMixin 一致：已登录即为已认证，是否启用由 is_active 单独判断
+        return True
+    
+    @property
+    def is_anonymous(self):
+        return False
+    
+    def __eq__(self, other):
+        if isinstance(other, User):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+    
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return NotImplemented
+        return not equal
+    
+    __hash__ = object.__hash__
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -48,4 +77,3 @@ class User(UserMixin):
     
     def get_id(self):
         return str(self.id)
-
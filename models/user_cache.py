@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+
+class UserCache:
+    """登录用户对象缓存（用户id -> User）
+
+    Flask-Login 每个请求都要加载当前用户，缓存后不必每次查询存储、构造 User。
+    缓存以存储的用户版本号为准：任何用户的增删改都会改变版本号，版本号变化时
+    整体失效，因此停用账号、修改角色在下一个请求立即生效。
+    """
+
+    def __init__(self, load, version, max_entries=1024):
+        # load(user_id) 从存储加载 User；version() 返回当前的用户版本号
+        self._load = load
+        self._version = version
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._entries_version = None
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """返回用户对象，不存在时返回None"""
+        # 先取版本号再加载：加载期间用户被修改时，缓存的结果会在下次访问时失效
+        version = self._version()
+        with self._lock:
+            if version != self._entries_version:
+                self._entries.clear()
+                self._entries_version = version
+            user = self._entries.get(user_id)
+            if user is not None:
+                self._entries.move_to_end(user_id)
+                return user
+        user = self._load(user_id)
+        if user is not None:
+            with self._lock:
+                if self._entries_version == version:
+                    self._entries[user_id] = user
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return user
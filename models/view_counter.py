@@ -0,0 +1,67 @@
+import os
+import time
+import atexit
+import threading
+from collections import Counter
+
+
+class ViewCounter:
+    """浏览次数累加器
+
+    浏览只在内存中累加，由后台线程每隔 interval 秒调用一次 flush(增量) 合并进存储，
+    进程退出时再合并一次。这样浏览页面不会触发整文件重写，并发浏览也不会丢失计数。
+    """
+
+    def __init__(self, flush, interval=10.0):
+        self._flush = flush
+        self.interval = interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        # 后台线程所在的进程，fork 后在子进程中重新启动
+        self._pid = None
+        self._registered = False
+
+    def _ensure_thread(self):
+        # 调用方持有 self._lock
+        if self._pid == os.getpid():
+            return
+        # 子进程继承的计数由父进程负责写入
+        self._pending = Counter()
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='view-counter', daemon=True).start()
+        if not self._registered:
+            atexit.register(self.flush)
+            self._registered = True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Failed to flush view counts: {e}")
+
+    def add(self, key, n=1):
+        """累加浏览次数，返回该键尚未写入存储的次数"""
+        with self._lock:
+            self._ensure_thread()
+            self._pending[key] += n
+            return self._pending[key]
+
+    def pending(self):
+        """尚未写入存储的增量 {键: 次数}"""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """把累计的增量写入存储，写入失败时放回，等待下次重试"""
+        with self._lock:
+            if self._pid != os.getpid() or not self._pending:
+                return
+            increments, self._pending = self._pending, Counter()
+        try:
+            self._flush(dict(increments))
+        except Exception:
+            with self._lock:
+                self._pending.update(increments)
+            raise
@@ -4,11 +4,16 @@
 
 echo "正在重启应用..."
 
+cd "$(dirname "$0")"
+
 # 停止应用
 ./stop.sh
 
-# 等待2秒
-sleep 2
+# 等待处理中的请求结束、主进程退出（最多30秒）
+for i in $(seq 30); do
+    [ -f logs/gunicorn.pid ] && kill -0 "$(cat logs/gunicorn.pid)" 2>/dev/null || break
+    sleep 1
+done
 
 # 启动应用
 ./start.sh
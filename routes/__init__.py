@@ -5,6 +5,7 @@ from routes.tasks import tasks_bp
 from routes.knowledge import knowledge_bp
 from routes.dashboard import dashboard_bp
 from routes.admin import admin_bp
+from routes.jobs import jobs_bp
 
 def register_routes(app, data_manager):
     """注册所有路由蓝图"""
@@ -17,4 +18,5 @@ def register_routes(app, data_manager):
     app.register_blueprint(knowledge_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(jobs_bp)
 
@@ -1,9 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import os
+import uuid
+from models.data_manager import encode_cursor
+from routes.pagination import page_args, wants_json
+from services.bulk_io import KINDS, FORMATS, EXPORT_FILTERS, detect_format, import_file, export_stream
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+def parse_date(value):
+    """解析 YYYY-MM-DD 格式的日期参数，无效时返回None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
 def admin_required(f):
     """管理员权限装饰器"""
     from functools import wraps
@@ -150,11 +163,125 @@ def logs():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    limit = int(request.args.get('limit', 100))
-    logs = data_manager.get_system_logs(limit=limit)
+    cursor, limit = page_args(default=100)
+    # 日期范围按天计算：结束日期当天的日志也包含在内
+    since = parse_date(request.args.get('since'))
+    until = parse_date(request.args.get('until'))
+    logs = data_manager.get_system_logs(
+        limit=limit, cursor=cursor,
+        since=since.isoformat() if since else None,
+        until=(until + timedelta(days=1)).isoformat() if until else None,
+        action=request.args.get('action') or None,
+        user_id=request.args.get('user_id') or None)
     logs.reverse()  # 最新的在前
+    # 取满一页说明可能还有更早的日志，以本页最早一条作为下一页游标
+    next_cursor = encode_cursor(logs[-1], 'timestamp') if len(logs) == limit else None
+    
+    if wants_json():
+        return jsonify({'items': logs, 'next_cursor': next_cursor})
+    
+    return render_template('admin/logs.html', logs=logs, next_cursor=next_cursor,
+                           users=data_manager.get_all_users())
+
+@admin_bp.route('/rebuild-counters', methods=['POST'])
+@login_required
+@admin_required
+def rebuild_counters():
+    from flask import current_app
+    data_manager = current_app.data_manager
+    
+    # 看板计数异常时从数据重新统计
+    data_manager.rebuild_counters()
+    data_manager.add_system_log(current_user.id, 'rebuild_counters', '重建看板统计计数')
+    
+    return jsonify({'success': True, 'message': '统计计数已重建'})
+
+@admin_bp.route('/data')
+@login_required
+@admin_required
+def data():
+    from flask import current_app
+    data_manager = current_app.data_manager
+    
+    return render_template('admin/data.html', roles=data_manager.get_all_roles())
+
+@admin_bp.route('/import/<kind>', methods=['POST'])
+@login_required
+@admin_required
+def import_data(kind):
+    """上传CSV/JSONL批量导入，在后台任务中分批写入，前端轮询任务状态查看进度"""
+    from flask import current_app
+    data_manager = current_app.data_manager
+    
+    if kind not in KINDS:
+        return jsonify({'success': False, 'message': f'不支持导入: {kind}'}), 404
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'message': '请选择要导入的文件'}), 400
+    try:
+        fmt = request.form.get('format') or detect_format(upload.filename)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'message': f'不支持的格式: {fmt}'}), 400
+    
+    # 上传的文件先保存下来，请求结束后由后台任务读取，导入完成后删除
+    import_dir = current_app.config['IMPORT_DIR']
+    os.makedirs(import_dir, exist_ok=True)
+    path = os.path.join(import_dir, f'{uuid.uuid4()}.{fmt}')
+    upload.save(path)
+    
+    job = current_app.import_queue.submit(
+        'import:' + os.path.basename(path), import_file,
+        data_manager, kind, path, fmt, current_user.id,
+        batch_size=current_app.config['BULK_BATCH_SIZE'], remove=True,
+        owner=current_user.id, progress=True)
+    
+    data_manager.add_system_log(
+        current_user.id,
+        'import_data',
+        f'批量导入{kind}: {upload.filename}'
+    )
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('jobs.status', job_id=job.id)
+    })
+
+@admin_bp.route('/export/<kind>')
+@login_required
+@admin_required
+def export_data(kind):
+    """按条件导出为CSV/JSONL，边读取边输出"""
+    from flask import current_app
+    data_manager = current_app.data_manager
+    
+    fmt = request.args.get('format', 'csv')
+    if kind not in KINDS or fmt not in FORMATS:
+        return jsonify({'success': False, 'message': '不支持的导出类型或格式'}), 404
+    
+    filters = {field: request.args[field] for field in EXPORT_FILTERS[kind]
+               if request.args.get(field)}
+    # 创建日期范围按天计算，结束日期当天也包含在内
+    since = parse_date(request.args.get('since'))
+    until = parse_date(request.args.get('until'))
+    
+    data_manager.add_system_log(
+        current_user.id,
+        'export_data',
+        f'导出{kind}（{fmt}），条件: {filters or "全部"}'
+    )
     
-    return render_template('admin/logs.html', logs=logs)
+    chunks = export_stream(data_manager, kind, fmt, filters,
+                           since=since.isoformat() if since else None,
+                           until=(until + timedelta(days=1)).isoformat() if until else None)
+    filename = f'{kind}-{datetime.now().strftime("%Y%m%d%H%M%S")}.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
 
 @admin_bp.route('/settings', methods=['GET', 'POST'])
 @login_required
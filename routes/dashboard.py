@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from collections import Counter
+import hashlib
+from models.data_manager import scope_filters
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
@@ -25,27 +26,39 @@ def api_stats():
     stats = get_statistics(data_manager, current_user)
     return jsonify(stats)
 
-@dashboard_bp.route('/api/objective-chart')
+@dashboard_bp.route('/api/summary')
 @login_required
-def objective_chart():
+def api_summary():
+    """一次返回统计数据和全部图表数据，支持ETag条件请求"""
     from flask import current_app
     data_manager = current_app.data_manager
     
-    objectives = data_manager.get_all_objectives()
+    # 数据版本不变且用户范围不变时，客户端缓存仍然有效
+    version = data_manager.data_version('objectives', 'issues', 'tasks')
+    etag = hashlib.md5(
+        f'{version}|{current_user.id}|{current_user.role}|{current_user.province}'.encode('utf-8')
+    ).hexdigest()
     
-    # 根据角色过滤
-    if current_user.role == 'staff':
-        objectives = [obj for obj in objectives if obj['target_user'] == current_user.id]
-    elif current_user.role == 'province_manager':
-        objectives = [obj for obj in objectives if obj['target_province'] == current_user.province]
-    
-    # 按状态统计
-    status_count = Counter([obj['status'] for obj in objectives])
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({
+            'stats': get_statistics(data_manager, current_user),
+            'objective_chart': get_objective_chart(data_manager, current_user),
+            'issue_chart': get_issue_chart(data_manager, current_user),
+            'task_distribution': get_task_distribution(data_manager, current_user),
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@dashboard_bp.route('/api/objective-chart')
+@login_required
+def objective_chart():
+    from flask import current_app
+    data_manager = current_app.data_manager
     
-    return jsonify({
-        'labels': list(status_count.keys()),
-        'data': list(status_count.values())
-    })
+    return jsonify(get_objective_chart(data_manager, current_user))
 
 @dashboard_bp.route('/api/issue-chart')
 @login_required
@@ -53,21 +66,7 @@ def issue_chart():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    issues = data_manager.get_all_issues()
-    
-    # 根据角色过滤
-    if current_user.role == 'staff':
-        issues = [i for i in issues if i['submitter_id'] == current_user.id]
-    elif current_user.role == 'province_manager':
-        issues = [i for i in issues if i['province'] == current_user.province]
-    
-    # 按类别统计
-    category_count = Counter([i['category'] for i in issues])
-    
-    return jsonify({
-        'labels': list(category_count.keys()),
-        'data': list(category_count.values())
-    })
+    return jsonify(get_issue_chart(data_manager, current_user))
 
 @dashboard_bp.route('/api/task-distribution')
 @login_required
@@ -75,51 +74,67 @@ def task_distribution():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    tasks = data_manager.get_all_tasks()
+    return jsonify(get_task_distribution(data_manager, current_user))
+
+def get_objective_chart(data_manager, user):
+    """目标状态图表数据"""
+    # 根据角色过滤，按状态统计
+    status_count = data_manager.count_by(
+        'objectives', 'status', **scope_filters('objectives', user))
+    
+    return {
+        'labels': list(status_count.keys()),
+        'data': list(status_count.values())
+    }
+
+def get_issue_chart(data_manager, user):
+    """问题类别图表数据"""
+    # 根据角色过滤，按类别统计
+    category_count = data_manager.count_by(
+        'issues', 'category', **scope_filters('issues', user))
     
-    # 根据角色过滤
-    if current_user.role == 'province_manager':
-        tasks = [t for t in tasks if t.get('province') == current_user.province]
+    return {
+        'labels': list(category_count.keys()),
+        'data': list(category_count.values())
+    }
+
+def get_task_distribution(data_manager, user):
+    """任务省份分布图表数据"""
+    # 根据角色过滤（普通员工可以查看全部任务的分布）
+    filters = {}
+    if user.role == 'province_manager':
+        filters = scope_filters('tasks', user)
     
     # 按省份统计
-    province_count = Counter([t.get('province', '未分配') for t in tasks])
+    province_count = data_manager.count_by('tasks', 'province', **filters)
     
-    return jsonify({
+    return {
         'labels': list(province_count.keys()),
         'data': list(province_count.values())
-    })
+    }
 
 def get_statistics(data_manager, user):
     """获取统计数据"""
-    objectives = data_manager.get_all_objectives()
-    issues = data_manager.get_all_issues()
-    tasks = data_manager.get_all_tasks()
-    
-    # 根据角色过滤
-    if user.role == 'staff':
-        objectives = [obj for obj in objectives if obj['target_user'] == user.id]
-        issues = [i for i in issues if i['submitter_id'] == user.id]
-        tasks = [t for t in tasks if t.get('assigned_to') == user.id]
-    elif user.role == 'province_manager':
-        objectives = [obj for obj in objectives if obj['target_province'] == user.province]
-        issues = [i for i in issues if i['province'] == user.province]
-        tasks = [t for t in tasks if t.get('province') == user.province]
+    # 根据角色过滤，读取按状态的分组计数
+    objectives = data_manager.count_by('objectives', 'status', **scope_filters('objectives', user))
+    issues = data_manager.count_by('issues', 'status', **scope_filters('issues', user))
+    tasks = data_manager.count_by('tasks', 'status', **scope_filters('tasks', user))
     
     # 计算统计数据
     stats = {
-        'total_objectives': len(objectives),
-        'completed_objectives': len([o for o in objectives if o['status'] == 'completed']),
-        'pending_objectives': len([o for o in objectives if o['status'] == 'pending']),
-        'in_progress_objectives': len([o for o in objectives if o['status'] == 'in_progress']),
-        'total_issues': len(issues),
-        'open_issues': len([i for i in issues if i['status'] == 'open']),
-        'resolved_issues': len([i for i in issues if i['status'] == 'resolved']),
-        'closed_issues': len([i for i in issues if i['status'] == 'closed']),
-        'total_tasks': len(tasks),
-        'pending_tasks': len([t for t in tasks if t['status'] == 'pending']),
-        'in_progress_tasks': len([t for t in tasks if t['status'] == 'in_progress']),
-        'completed_tasks': len([t for t in tasks if t['status'] == 'completed']),
-        'verified_tasks': len([t for t in tasks if t['status'] == 'verified']),
+        'total_objectives': sum(objectives.values()),
+        'completed_objectives': objectives.get('completed', 0),
+        'pending_objectives': objectives.get('pending', 0),
+        'in_progress_objectives': objectives.get('in_progress', 0),
+        'total_issues': sum(issues.values()),
+        'open_issues': issues.get('open', 0),
+        'resolved_issues': issues.get('resolved', 0),
+        'closed_issues': issues.get('closed', 0),
+        'total_tasks': sum(tasks.values()),
+        'pending_tasks': tasks.get('pending', 0),
+        'in_progress_tasks': tasks.get('in_progress', 0),
+        'completed_tasks': tasks.get('completed', 0),
+        'verified_tasks': tasks.get('verified', 0),
     }
     
     # 计算完成率
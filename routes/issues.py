@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
-from services.ai_service import AIService
+import json
+import hashlib
+from models.data_manager import scope_filters
+from routes.pagination import page_args, wants_json
+from services.ai_service import AIServiceError
 
 issues_bp = Blueprint('issues', __name__, url_prefix='/issues')
 
@@ -10,18 +14,15 @@ def index():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    issues = data_manager.get_all_issues()
+    # 根据角色过滤，按创建时间倒序游标分页
+    cursor, limit = page_args()
+    issues, next_cursor = data_manager.paginate(
+        'issues', cursor=cursor, limit=limit, **scope_filters('issues', current_user))
     
-    # 根据角色过滤
-    if current_user.role == 'staff':
-        issues = [issue for issue in issues if issue['submitter_id'] == current_user.id]
-    elif current_user.role == 'province_manager':
-        issues = [issue for issue in issues if issue['province'] == current_user.province]
+    if wants_json():
+        return jsonify({'items': issues, 'next_cursor': next_cursor})
     
-    # 排序（最新的在前）
-    issues.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    return render_template('issues/list.html', issues=issues)
+    return render_template('issues/list.html', issues=issues, next_cursor=next_cursor)
 
 @issues_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -61,8 +62,7 @@ def detail(issue_id):
     from flask import current_app
     data_manager = current_app.data_manager
     
-    issues = data_manager.get_all_issues()
-    issue = next((i for i in issues if i['id'] == issue_id), None)
+    issue = data_manager.get_issue_by_id(issue_id)
     
     if not issue:
         flash('问题不存在', 'error')
@@ -125,6 +125,15 @@ def update_status(issue_id):
     
     return jsonify({'success': True, 'message': '状态更新成功'})
 
+def summary_filters(args):
+    """AI总结的过滤条件（省份、类别、状态）"""
+    filters = {}
+    for field in ('province', 'category', 'status'):
+        value = args.get(field)
+        if value:
+            filters[field] = value
+    return filters
+
 @issues_bp.route('/ai-summary', methods=['POST'])
 @login_required
 def ai_summary():
@@ -134,24 +143,17 @@ def ai_summary():
         return jsonify({'success': False, 'message': '无权限使用AI功能'})
     
     data_manager = current_app.data_manager
-    issues = data_manager.get_all_issues()
     
     # 过滤要总结的问题
-    filter_province = request.form.get('province')
-    filter_category = request.form.get('category')
-    filter_status = request.form.get('status')
-    
-    filtered_issues = issues
-    if filter_province:
-        filtered_issues = [i for i in filtered_issues if i.get('province') == filter_province]
-    if filter_category:
-        filtered_issues = [i for i in filtered_issues if i.get('category') == filter_category]
-    if filter_status:
-        filtered_issues = [i for i in filtered_issues if i.get('status') == filter_status]
-    
-    # 调用AI服务
-    ai_service = AIService(current_app.config['DEEPSEEK_API_KEY'])
-    summary = ai_service.summarize_issues(filtered_issues)
+    filtered_issues = data_manager.query('issues', **summary_filters(request.form))
+    
+    # AI调用耗时较长，交给后台任务执行，前端轮询任务状态；
+    # 同一批问题（内容未变）的总结正在生成时直接返回该任务
+    key = 'issues-summary:' + hashlib.sha256(json.dumps(
+        [(issue['id'], issue.get('updated_at')) for issue in filtered_issues]
+    ).encode('utf-8')).hexdigest()
+    job = current_app.job_queue.submit(key, current_app.ai_service.summarize_issues,
+                                       filtered_issues, owner=current_user.id)
     
     data_manager.add_system_log(
         current_user.id,
@@ -159,5 +161,56 @@ def ai_summary():
         f'生成问题AI总结，共 {len(filtered_issues)} 条'
     )
     
-    return jsonify({'success': True, 'summary': summary})
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('jobs.status', job_id=job.id)
+    })
 
+@issues_bp.route('/ai-summary/stream')
+@login_required
+def ai_summary_stream():
+    """以服务端事件（SSE）逐段推送AI总结，浏览器用 EventSource 接收"""
+    from flask import current_app
+    
+    if current_user.role not in ['admin', 'province_manager']:
+        return jsonify({'success': False, 'message': '无权限使用AI功能'}), 403
+    
+    # 实时总结占用当前工作线程直到生成结束，名额满时由前端改用后台任务
+    slots = current_app.ai_stream_slots
+    if not slots.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'AI实时总结繁忙，请稍后再试'}), 429
+    
+    data_manager = current_app.data_manager
+    try:
+        filtered_issues = data_manager.query('issues', **summary_filters(request.args))
+        
+        data_manager.add_system_log(
+            current_user.id,
+            'ai_summary',
+            f'生成问题AI总结（实时），共 {len(filtered_issues)} 条'
+        )
+    except Exception:
+        slots.release()
+        raise
+    
+    def event(data, name=None):
+        prefix = f'event: {name}\n' if name else ''
+        return f'{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n'
+    
+    ai_service = current_app.ai_service
+    
+    def generate():
+        try:
+            for delta in ai_service.stream_summarize_issues(filtered_issues):
+                yield event({'delta': delta})
+        except AIServiceError as e:
+            yield event({'message': str(e)}, 'failed')
+            return
+        yield event({}, 'done')
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # 响应结束（包括客户端提前断开）时归还名额
+    response.call_on_close(slots.release)
+    return response
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+@jobs_bp.route('/<job_id>')
+@login_required
+def status(job_id):
+    from flask import current_app
+    
+    job = current_app.job_queue.get(job_id) or current_app.import_queue.get(job_id)
+    
+    # 只有提交者（包括重复提交、共用该任务的用户）和管理员可以查看任务结果
+    if not job or (current_user.id not in job.get('owners', [job['owner']])
+                   and current_user.role != 'admin'):
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    
+    return jsonify({'success': True, 'job': job})
@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-import markdown
 
 knowledge_bp = Blueprint('knowledge', __name__, url_prefix='/knowledge')
 
@@ -10,31 +9,42 @@ def index():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    knowledge_list = data_manager.get_all_knowledge()
-    
     # 搜索和过滤
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     category = request.args.get('category', '')
     
     if search:
-        knowledge_list = [k for k in knowledge_list 
-                         if search.lower() in k['title'].lower() 
-                         or search.lower() in k['content'].lower()]
-    
-    if category:
-        knowledge_list = [k for k in knowledge_list if k['category'] == category]
-    
-    # 排序
-    knowledge_list.sort(key=lambda x: x['created_at'], reverse=True)
+        # 全文索引检索，按相关度排序
+        knowledge_list = data_manager.search_knowledge(search, category=category or None)
+    else:
+        if category:
+            knowledge_list = data_manager.query('knowledge', category=category)
+        else:
+            knowledge_list = data_manager.get_all_knowledge()
+        # 排序
+        knowledge_list.sort(key=lambda x: x['created_at'], reverse=True)
     
     # 获取所有分类
-    all_knowledge = data_manager.get_all_knowledge()
-    categories = list(set([k['category'] for k in all_knowledge]))
+    categories = list(data_manager.count_by('knowledge', 'category'))
     
     return render_template('knowledge/list.html', 
                          knowledge_list=knowledge_list,
                          categories=categories)
 
+@knowledge_bp.route('/api/top-viewed')
+@login_required
+def api_top_viewed():
+    from flask import current_app
+    data_manager = current_app.data_manager
+    
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    top = data_manager.get_top_knowledge(limit)
+    
+    return jsonify({'items': [
+        {'id': k['id'], 'title': k['title'], 'category': k['category'], 'views': k.get('views') or 0}
+        for k in top
+    ]})
+
 @knowledge_bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
@@ -55,6 +65,8 @@ def create():
             author_id=current_user.id,
             tags=tags
         )
+        # 写入时预先渲染，首次浏览直接命中缓存
+        current_app.markdown_cache.render(knowledge)
         
         data_manager.add_system_log(
             current_user.id,
@@ -73,18 +85,17 @@ def detail(knowledge_id):
     from flask import current_app
     data_manager = current_app.data_manager
     
-    knowledge_list = data_manager.get_all_knowledge()
-    knowledge = next((k for k in knowledge_list if k['id'] == knowledge_id), None)
+    knowledge = data_manager.get_knowledge_by_id(knowledge_id)
     
     if not knowledge:
         flash('知识不存在', 'error')
         return redirect(url_for('knowledge.index'))
     
-    # 增加浏览次数
-    data_manager.update_knowledge(knowledge_id, views=knowledge.get('views', 0) + 1)
-    
-    # 转换Markdown
-    knowledge['html_content'] = markdown.markdown(knowledge['content'])
+    # 转换Markdown（复制一份，避免修改缓存中的数据），正文未变时直接使用缓存的渲染结果
+    knowledge = dict(knowledge)
+    # 增加浏览次数（在内存中累加，定期写入）
+    knowledge['views'] = data_manager.record_knowledge_view(knowledge_id)
+    knowledge['html_content'] = current_app.markdown_cache.render(knowledge)
     
     return render_template('knowledge/detail.html', knowledge=knowledge)
 
@@ -94,8 +105,7 @@ def edit(knowledge_id):
     from flask import current_app
     data_manager = current_app.data_manager
     
-    knowledge_list = data_manager.get_all_knowledge()
-    knowledge = next((k for k in knowledge_list if k['id'] == knowledge_id), None)
+    knowledge = data_manager.get_knowledge_by_id(knowledge_id)
     
     if not knowledge:
         flash('知识不存在', 'error')
@@ -120,6 +130,10 @@ def edit(knowledge_id):
             category=category,
             tags=tags
         )
+        # 预先渲染更新后的内容；文章在更新后被其他请求删除时跳过
+        updated = data_manager.get_knowledge_by_id(knowledge_id)
+        if updated is not None:
+            current_app.markdown_cache.render(updated)
         
         data_manager.add_system_log(
             current_user.id,
@@ -138,8 +152,7 @@ def delete(knowledge_id):
     from flask import current_app
     data_manager = current_app.data_manager
     
-    knowledge_list = data_manager.get_all_knowledge()
-    knowledge = next((k for k in knowledge_list if k['id'] == knowledge_id), None)
+    knowledge = data_manager.get_knowledge_by_id(knowledge_id)
     
     if not knowledge:
         return jsonify({'success': False, 'message': '知识不存在'})
@@ -149,6 +162,7 @@ def delete(knowledge_id):
         return jsonify({'success': False, 'message': '无权限删除'})
     
     data_manager.delete_knowledge(knowledge_id)
+    current_app.markdown_cache.discard(knowledge_id)
     data_manager.add_system_log(
         current_user.id,
         'delete_knowledge',
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
+from models.data_manager import scope_filters
+from routes.pagination import page_args, wants_json
 
 objectives_bp = Blueprint('objectives', __name__, url_prefix='/objectives')
 
@@ -10,15 +12,15 @@ def index():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    objectives = data_manager.get_all_objectives()
+    # 根据用户角色过滤目标，按创建时间倒序游标分页
+    cursor, limit = page_args()
+    objectives, next_cursor = data_manager.paginate(
+        'objectives', cursor=cursor, limit=limit, **scope_filters('objectives', current_user))
     
-    # 根据用户角色过滤目标
-    if current_user.role == 'staff':
-        objectives = [obj for obj in objectives if obj['target_user'] == current_user.id]
-    elif current_user.role == 'province_manager':
-        objectives = [obj for obj in objectives if obj['target_province'] == current_user.province]
+    if wants_json():
+        return jsonify({'items': objectives, 'next_cursor': next_cursor})
     
-    return render_template('objectives/list.html', objectives=objectives)
+    return render_template('objectives/list.html', objectives=objectives, next_cursor=next_cursor)
 
 @objectives_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -79,8 +81,7 @@ def detail(objective_id):
         return redirect(url_for('objectives.index'))
     
     # 获取子目标
-    all_objectives = data_manager.get_all_objectives()
-    sub_objectives = [obj for obj in all_objectives if obj.get('parent_id') == objective_id]
+    sub_objectives = data_manager.query('objectives', parent_id=objective_id)
     
     return render_template('objectives/detail.html', 
                          objective=objective,
@@ -0,0 +1,18 @@
+from flask import current_app, request
+
+# 单页记录数上限，防止 ?limit= 一次拉取全部数据
+MAX_PAGE_SIZE = 100
+
+def page_args(default=None):
+    """读取游标分页参数，返回 (cursor, limit)
+
+    limit 默认为 ITEMS_PER_PAGE，并限制在 1 ~ MAX_PAGE_SIZE 之间。
+    """
+    if default is None:
+        default = current_app.config['ITEMS_PER_PAGE']
+    limit = request.args.get('limit', default, type=int)
+    return request.args.get('cursor') or None, max(1, min(limit, MAX_PAGE_SIZE))
+
+def wants_json():
+    """请求是否要求以JSON返回列表（?format=json）"""
+    return request.args.get('format') == 'json'
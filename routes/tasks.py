@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from models.data_manager import scope_filters
+from routes.pagination import page_args, wants_json
 
 tasks_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
@@ -9,18 +11,15 @@ def index():
     from flask import current_app
     data_manager = current_app.data_manager
     
-    tasks = data_manager.get_all_tasks()
+    # 根据角色过滤，按创建时间倒序游标分页
+    cursor, limit = page_args()
+    tasks, next_cursor = data_manager.paginate(
+        'tasks', cursor=cursor, limit=limit, **scope_filters('tasks', current_user))
     
-    # 根据角色过滤
-    if current_user.role == 'staff':
-        tasks = [t for t in tasks if t.get('assigned_to') == current_user.id]
-    elif current_user.role == 'province_manager':
-        tasks = [t for t in tasks if t.get('province') == current_user.province]
+    if wants_json():
+        return jsonify({'items': tasks, 'next_cursor': next_cursor})
     
-    # 排序
-    tasks.sort(key=lambda x: x['created_at'], reverse=True)
-    
-    return render_template('tasks/list.html', tasks=tasks)
+    return render_template('tasks/list.html', tasks=tasks, next_cursor=next_cursor)
 
 @tasks_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -80,8 +79,7 @@ def detail(task_id):
     from flask import current_app
     data_manager = current_app.data_manager
     
-    tasks = data_manager.get_all_tasks()
-    task = next((t for t in tasks if t['id'] == task_id), None)
+    task = data_manager.get_task_by_id(task_id)
     
     if not task:
         flash('任务不存在', 'error')
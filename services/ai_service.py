@@ -1,79 +1,299 @@
 import requests
 import json
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+class ResponseCache:
+    """AI回复缓存
+
+    以请求内容（模型参数 + 提示词）的哈希为键，只缓存调用成功的回复。
+    条目超过 ttl 秒过期，内存中最多保留 max_entries 条（LRU淘汰）；
+    指定 cache_dir 时同时保存到磁盘，重启后仍然有效。
+    """
+    
+    def __init__(self, ttl=3600, max_entries=128, cache_dir=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        # 键 -> (过期时间, 回复内容)，按最近使用排序
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def key(payload):
+        """请求内容的哈希，字段顺序不影响结果"""
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+    
+    def _remember(self, key, expires_at, value):
+        # 调用方持有 self._lock
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get(self, key):
+        """返回未过期的缓存内容，没有时返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if cached.get('expires_at', 0) <= now:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            return None
+        with self._lock:
+            self._remember(key, cached['expires_at'], cached['content'])
+        return cached['content']
+    
+    def set(self, key, value):
+        """缓存一条回复"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+        if self.cache_dir:
+            path = self._path(key)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'expires_at': expires_at, 'content': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+_CJK_RE = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+
+def estimate_tokens(text):
+    """粗略估算文本的token数（偏保守）：中日韩字符按每字1个token，其余字符按每4个1个token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+class AIServiceError(Exception):
+    """AI调用失败（未配置密钥、网络错误、接口返回错误状态等）"""
 
 class AIService:
-    def __init__(self, api_key, api_base='https://api.deepseek.com/v1'):
+    MODEL = 'deepseek-chat'
+    ISSUES_SYSTEM_PROMPT = "你是一个专业的项目管理助手，擅长分析和总结项目中的问题和需求。"
+    OBJECTIVES_SYSTEM_PROMPT = "你是一个专业的项目管理助手。"
+    CONNECT_TIMEOUT = 10
+    
+    def __init__(self, api_key, api_base='https://api.deepseek.com/v1', cache=None,
+                 pool_size=10, max_retries=3, timeout=30, chunk_tokens=6000, map_workers=4):
         self.api_key = api_key
         self.api_base = api_base
+        self.cache = cache
+        # 每个提示词中数据部分的token预算，超出时分批总结；分批总结同时调用的最大数量
+        self.chunk_tokens = chunk_tokens
+        self.map_workers = map_workers
+        # 连接超时和读取超时（秒）；流式输出时读取超时指两段输出之间的最长间隔
+        self.timeout = (self.CONNECT_TIMEOUT, timeout)
+        # 应用生命周期内共用的会话，复用到API服务器的TCP/TLS连接；
+        # 429和5xx按指数退避重试（0.5s、1s、2s……），并遵守 Retry-After
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
     
-    def summarize_issues(self, issues):
-        """使用DeepSeek API总结问题"""
+    def _payload(self, system_prompt, prompt):
+        return {
+            "model": self.MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+    
+    def _post(self, payload, stream=False):
+        """发送chat请求，失败时抛出 AIServiceError"""
         if not self.api_key:
-            return "未配置DeepSeek API密钥，无法使用AI功能。请在环境变量中设置DEEPSEEK_API_KEY。"
+            raise AIServiceError("未配置DeepSeek API密钥，无法使用AI功能。请在环境变量中设置DEEPSEEK_API_KEY。")
+        try:
+            response = self.session.post(f"{self.api_base}/chat/completions", json=payload,
+                                         timeout=self.timeout, stream=stream)
+        except requests.RequestException as e:
+            raise AIServiceError(f"AI服务请求失败: {e}") from e
+        if response.status_code != 200:
+            detail = response.text[:200]
+            response.close()
+            raise AIServiceError(f"API调用失败: {response.status_code} - {detail}")
+        return response
+    
+    def _chat(self, system_prompt, prompt):
+        """调用chat接口返回回复内容；相同请求命中缓存时不再调用"""
+        payload = self._payload(system_prompt, prompt)
+        key = ResponseCache.key(payload) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        if not issues:
-            return "没有问题需要总结。"
+        response = self._post(payload)
+        try:
+            content = response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise AIServiceError(f"AI服务返回了无法解析的结果: {e}") from e
+        if key is not None:
+            self.cache.set(key, content)
+        return content
+    
+    def _stream_chat(self, system_prompt, prompt):
+        """流式调用chat接口，逐段产出回复内容；完整回复写入缓存，命中缓存时一次产出"""
+        payload = self._payload(system_prompt, prompt)
+        key = ResponseCache.key(payload) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
         
-        # 构建提示词
-        issues_text = "\n\n".join([
-            f"问题 {i+1}:\n标题: {issue['title']}\n描述: {issue['description']}\n类别: {issue['category']}\n优先级: {issue['priority']}\n状态: {issue['status']}"
-            for i, issue in enumerate(issues[:20])  # 限制最多20条
+        parts = []
+        with self._post(dict(payload, stream=True), stream=True) as response:
+            try:
+                for line in response.iter_lines():
+                    # 服务端事件格式: "data: {...}"，以 "data: [DONE]" 结束
+                    if not line.startswith(b'data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == b'[DONE]':
+                        break
+                    delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except requests.RequestException as e:
+                raise AIServiceError(f"AI服务连接中断: {e}") from e
+            except (ValueError, KeyError, IndexError) as e:
+                raise AIServiceError(f"AI服务返回了无法解析的结果: {e}") from e
+        if key is not None and parts:
+            self.cache.set(key, ''.join(parts))
+    
+    def _batches(self, blocks):
+        """按token预算把文本块依次装入若干批，返回每批拼接后的文本
+        
+        依次装填保证前面的批次不受新增条目影响，分批总结的结果可以继续命中缓存。
+        单个超出预算的文本块截断后单独成批。
+        """
+        batches, current, used = [], [], 0
+        for block in blocks:
+            tokens = estimate_tokens(block)
+            if tokens > self.chunk_tokens:
+                # 每个字符至少约1/4个token，截到预算字数以内一定不超预算
+                block = block[:self.chunk_tokens]
+                tokens = estimate_tokens(block)
+            if current and used + tokens > self.chunk_tokens:
+                batches.append("\n\n".join(current))
+                current, used = [], 0
+            current.append(block)
+            used += tokens
+        if current:
+            batches.append("\n\n".join(current))
+        return batches
+    
+    def _map(self, system_prompt, prompts):
+        """并发调用各批提示词（最多 map_workers 个同时进行），按顺序返回结果"""
+        if len(prompts) == 1:
+            return [self._chat(system_prompt, prompts[0])]
+        with ThreadPoolExecutor(max_workers=min(self.map_workers, len(prompts)),
+                                thread_name_prefix='ai-map') as pool:
+            return list(pool.map(lambda prompt: self._chat(system_prompt, prompt), prompts))
+    
+    def _condense(self, system_prompt, label, blocks):
+        """把数据压缩到一个提示词的预算内，返回 (文本, 是否为提炼后的要点)
+        
+        放不下时先分批并发提炼要点（map），要点仍放不下时再分批合并，直到放得下（reduce）。
+        """
+        batches = self._batches(blocks)
+        if len(batches) == 1:
+            return batches[0], False
+        notes = self._map(system_prompt, [
+            f"请提炼以下{label}的要点（主要类别及数量、高优先级或有风险的条目、共性现象），不超过300字：\n\n{batch}"
+            for batch in batches
         ])
+        while True:
+            batches = self._batches(notes)
+            if len(batches) == 1 or len(batches) >= len(notes):
+                return "\n\n".join(batches), True
+            notes = self._map(system_prompt, [
+                f"以下是分批提炼的{label}要点，请合并为一份要点，保留数量和关键条目，不超过500字：\n\n{batch}"
+                for batch in batches
+            ])
+    
+    @staticmethod
+    def _ordered(items):
+        # 按创建时间排序，新增条目排在最后，已有条目的分批保持不变
+        return sorted(items, key=lambda item: (item.get('created_at') or '', item.get('id') or ''))
+    
+    def _issues_prompt(self, issues):
+        """生成问题总结的提示词，问题过多时先分批提炼要点"""
+        blocks = [
+            f"问题 {i+1}:\n标题: {issue['title']}\n描述: {issue['description']}\n类别: {issue['category']}\n优先级: {issue['priority']}\n状态: {issue['status']}"
+            for i, issue in enumerate(self._ordered(issues))
+        ]
+        issues_text, condensed = self._condense(self.ISSUES_SYSTEM_PROMPT, '问题', blocks)
         
-        prompt = f"""请对以下问题进行分析和总结：
-
-{issues_text}
-
-请从以下几个方面进行总结：
+        if condensed:
+            intro = f"以下是对全部 {len(issues)} 条问题分批提炼的要点：\n\n{issues_text}\n\n请在此基础上从以下几个方面进行总结："
+        else:
+            intro = f"请对以下问题进行分析和总结：\n\n{issues_text}\n\n请从以下几个方面进行总结："
+        
+        return f"""{intro}
 1. 问题的主要类别和分布
 2. 高优先级问题的共同特点
 3. 问题的主要趋势
 4. 建议的改进措施
 
 请用中文回答，并保持简洁明了。"""
-        
-        try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的项目管理助手，擅长分析和总结项目中的问题和需求。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                return f"API调用失败: {response.status_code} - {response.text}"
-        
-        except Exception as e:
-            return f"AI总结失败: {str(e)}"
     
-    def analyze_objective_progress(self, objectives):
-        """分析目标进度"""
-        if not self.api_key:
-            return "未配置DeepSeek API密钥。"
-        
-        if not objectives:
-            return "没有目标数据需要分析。"
-        
-        objectives_text = "\n\n".join([
+    def _objectives_prompt(self, objectives):
+        """生成目标分析的提示词，目标过多时先分批提炼要点"""
+        blocks = [
             f"目标 {i+1}:\n标题: {obj['title']}\n进度: {obj['progress']}%\n状态: {obj['status']}\n截止日期: {obj['deadline']}"
-            for i, obj in enumerate(objectives[:15])
-        ])
+            for i, obj in enumerate(self._ordered(objectives))
+        ]
+        objectives_text, condensed = self._condense(self.OBJECTIVES_SYSTEM_PROMPT, '目标', blocks)
+        
+        if condensed:
+            intro = f"以下是对全部 {len(objectives)} 个目标分批提炼的要点，请据此分析目标的完成情况："
+        else:
+            intro = "请分析以下目标的完成情况："
         
-        prompt = f"""请分析以下目标的完成情况：
+        return f"""{intro}
 
 {objectives_text}
 
@@ -83,32 +303,22 @@ class AIService:
 3. 改进建议
 
 请用中文回答。"""
-        
-        try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的项目管理助手。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                return f"API调用失败: {response.status_code}"
-        
-        except Exception as e:
-            return f"AI分析失败: {str(e)}"
-
+    
+    def summarize_issues(self, issues):
+        """使用DeepSeek API总结问题，失败时抛出 AIServiceError"""
+        if not issues:
+            return "没有问题需要总结。"
+        return self._chat(self.ISSUES_SYSTEM_PROMPT, self._issues_prompt(issues))
+    
+    def stream_summarize_issues(self, issues):
+        """流式总结问题，逐段产出总结内容"""
+        if not issues:
+            yield "没有问题需要总结。"
+            return
+        yield from self._stream_chat(self.ISSUES_SYSTEM_PROMPT, self._issues_prompt(issues))
+    
+    def analyze_objective_progress(self, objectives):
+        """分析目标进度，失败时抛出 AIServiceError"""
+        if not objectives:
+            return "没有目标数据需要分析。"
+        return self._chat(self.OBJECTIVES_SYSTEM_PROMPT, self._objectives_prompt(objectives))
@@ -0,0 +1,334 @@
+import io
+import os
+import csv
+import uuid
+from datetime import datetime
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+from models.records import Record
+
+# 支持批量导入导出的数据集
+KINDS = ('issues', 'tasks', 'users')
+FORMATS = ('csv', 'jsonl')
+
+CATEGORIES = ('bug', 'feature', 'improvement', 'question')
+PRIORITIES = ('low', 'medium', 'high', 'urgent')
+ISSUE_STATUSES = ('open', 'assigned', 'in_progress', 'resolved', 'closed')
+TASK_TYPES = ('support', 'maintenance', 'deployment', 'other')
+TASK_STATUSES = ('pending', 'assigned', 'in_progress', 'completed', 'verified')
+
+# CSV导出的列，导入CSV时按同样的列名读取。评论和工作日志只在JSONL中导出和导入；
+# 用户的密码哈希不导出
+CSV_FIELDS = {
+    'issues': ('id', 'title', 'description', 'category', 'priority', 'status',
+               'submitter_id', 'province', 'assigned_to', 'created_at', 'updated_at'),
+    'tasks': ('id', 'title', 'description', 'task_type', 'priority', 'status',
+              'creator_id', 'assigned_to', 'province', 'created_at', 'updated_at',
+              'completed_at', 'verified_at'),
+    'users': ('id', 'username', 'email', 'role', 'province', 'department',
+              'created_at', 'is_active'),
+}
+
+# 导出时可用的筛选字段（相等条件）
+EXPORT_FILTERS = {
+    'issues': ('province', 'status', 'category', 'priority', 'submitter_id', 'assigned_to'),
+    'tasks': ('province', 'status', 'task_type', 'priority', 'creator_id', 'assigned_to'),
+    'users': ('role', 'province', 'department'),
+}
+
+# 导入结果中最多列出的错误行数，其余只计数
+MAX_ERRORS = 100
+
+# 导出时每攒够这么多行输出一次
+EXPORT_CHUNK_ROWS = 500
+
+_TRUE = ('1', 'true', 'yes', 'y', '是')
+_FALSE = ('0', 'false', 'no', 'n', '否')
+
+
+def detect_format(filename):
+    """按文件扩展名判断格式：.csv / .jsonl（.ndjson）"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f'无法识别的文件格式: {filename}，请使用 .csv 或 .jsonl')
+
+
+def read_rows(stream, fmt, codec):
+    """逐行读取二进制流中的CSV/JSONL，返回 (行号, 数据) 的迭代器
+
+    CSV第一行为列名，兼容Excel保存的带BOM的UTF-8；JSONL中无法解析的行数据为None，
+    由校验报告为错误行，不中断导入。
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, codec.loads(line)
+        except ValueError:
+            yield line_no, None
+
+
+def _text(row, field):
+    """取字段值，去掉首尾空白，空字符串视为未填写"""
+    value = row.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = str(value)
+    return value.strip() or None
+
+
+def _required(row, field):
+    value = _text(row, field)
+    if value is None:
+        raise ValueError(f'缺少必填字段 {field}')
+    return value
+
+
+def _choice(row, field, choices, default):
+    value = _text(row, field) or default
+    if value is None:
+        raise ValueError(f'缺少必填字段 {field}')
+    if value not in choices:
+        raise ValueError(f'{field} 的取值无效: {value}，可选 {"/".join(choices)}')
+    return value
+
+
+def _timestamp(row, field, default=None):
+    """ISO格式的时间（或日期），统一为 datetime.isoformat() 的格式"""
+    value = _text(row, field)
+    if value is None:
+        return default
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f'{field} 不是有效的时间: {value}') from None
+
+
+def _flag(row, field, default=True):
+    value = row.get(field)
+    if isinstance(value, bool):
+        return value
+    value = _text(row, field)
+    if value is None:
+        return default
+    if value.lower() in _TRUE:
+        return True
+    if value.lower() in _FALSE:
+        return False
+    raise ValueError(f'{field} 的取值无效: {value}')
+
+
+def _items(row, field):
+    """评论/工作日志列表（只有JSONL可以携带），缺少的id和时间补齐"""
+    items = row.get(field)
+    if items in (None, ''):
+        return []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f'{field} 必须是对象列表')
+    return [dict(item, id=item.get('id') or str(uuid.uuid4()),
+                 created_at=item.get('created_at') or datetime.now().isoformat())
+            for item in items]
+
+
+def _build_issue(row, context):
+    now = datetime.now().isoformat()
+    created_at = _timestamp(row, 'created_at', now)
+    return {
+        'id': _text(row, 'id') or str(uuid.uuid4()),
+        'title': _required(row, 'title'),
+        'description': _text(row, 'description') or '',
+        'category': _choice(row, 'category', CATEGORIES, None),
+        'priority': _choice(row, 'priority', PRIORITIES, 'medium'),
+        'status': _choice(row, 'status', ISSUE_STATUSES, 'open'),
+        'submitter_id': _text(row, 'submitter_id') or context['operator_id'],
+        'province': _text(row, 'province'),
+        'assigned_to': _text(row, 'assigned_to'),
+        'created_at': created_at,
+        'updated_at': _timestamp(row, 'updated_at', created_at),
+        'comments': _items(row, 'comments')
+    }
+
+
+def _build_task(row, context):
+    now = datetime.now().isoformat()
+    created_at = _timestamp(row, 'created_at', now)
+    return {
+        'id': _text(row, 'id') or str(uuid.uuid4()),
+        'title': _required(row, 'title'),
+        'description': _text(row, 'description') or '',
+        'task_type': _choice(row, 'task_type', TASK_TYPES, None),
+        'priority': _choice(row, 'priority', PRIORITIES, 'medium'),
+        'status': _choice(row, 'status', TASK_STATUSES, 'pending'),
+        'creator_id': _text(row, 'creator_id') or context['operator_id'],
+        'assigned_to': _text(row, 'assigned_to'),
+        'province': _text(row, 'province'),
+        'created_at': created_at,
+        'updated_at': _timestamp(row, 'updated_at', created_at),
+        'logs': _items(row, 'logs'),
+        'completed_at': _timestamp(row, 'completed_at'),
+        'verified_at': _timestamp(row, 'verified_at')
+    }
+
+
+def _build_user(row, context):
+    role = _required(row, 'role')
+    if role not in context['roles']:
+        raise ValueError(f'角色不存在: {role}')
+    # 导出的数据不含密码，导入时需要提供初始密码（或从其他系统迁移的密码哈希）
+    password = _text(row, 'password')
+    password_hash = _text(row, 'password_hash')
+    if password is None and password_hash is None:
+        raise ValueError('缺少必填字段 password')
+    return {
+        'id': _text(row, 'id') or str(uuid.uuid4()),
+        'username': _required(row, 'username'),
+        'email': _text(row, 'email'),
+        'password_hash': generate_password_hash(password) if password else password_hash,
+        'role': role,
+        'province': _text(row, 'province'),
+        'department': _text(row, 'department'),
+        'created_at': _timestamp(row, 'created_at', datetime.now().isoformat()),
+        'is_active': _flag(row, 'is_active')
+    }
+
+
+_BUILDERS = {
+    'issues': _build_issue,
+    'tasks': _build_task,
+    'users': _build_user,
+}
+
+
+def import_rows(data_manager, kind, rows, operator_id, batch_size=500, progress=None):
+    """分批校验并导入 (行号, 数据) 序列，返回导入结果
+
+    每批先逐行校验、补齐默认值，再调用 data_manager.bulk_insert 一次写入：整批只加
+    一次锁、写一次文件。校验失败或id、用户名重复的行跳过并记录行号和原因，不影响
+    其他行。每批写入后调用 progress(进度) 报告已处理、已导入、失败的条数。
+    未填写提交人/创建人的问题和任务记为 operator_id 创建。
+    """
+    build = _BUILDERS[kind]
+    context = {'operator_id': operator_id}
+    if kind == 'users':
+        context['roles'] = {role['id'] for role in data_manager.get_all_roles()}
+    result = {'kind': kind, 'processed': 0, 'imported': 0, 'failed': 0, 'batches': 0,
+              'errors': []}
+
+    def fail(line_no, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_ERRORS:
+            result['errors'].append({'line': line_no, 'message': message})
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        records, lines = [], []
+        for line_no, row in batch:
+            if not isinstance(row, dict):
+                fail(line_no, '不是有效的JSON对象')
+                continue
+            try:
+                records.append(build(row, context))
+                lines.append(line_no)
+            except ValueError as e:
+                fail(line_no, str(e))
+        if records:
+            imported, rejected = data_manager.bulk_insert(kind, records)
+            for position, message in rejected:
+                fail(lines[position], message)
+            result['imported'] += imported
+        result['processed'] += len(batch)
+        result['batches'] += 1
+        if progress is not None:
+            progress({key: result[key] for key in ('processed', 'imported', 'failed', 'batches')})
+    result['errors'].sort(key=lambda error: error['line'])
+    return result
+
+
+def import_file(data_manager, kind, path, fmt, operator_id, batch_size=500, progress=None,
+                remove=False):
+    """导入CSV/JSONL文件，参数和返回值同 import_rows；remove 为 True 时导入后删除文件"""
+    try:
+        with open(path, 'rb') as f:
+            return import_rows(data_manager, kind, read_rows(f, fmt, data_manager.codec),
+                               operator_id, batch_size=batch_size, progress=progress)
+    finally:
+        if remove:
+            os.remove(path)
+
+
+def _export_records(data_manager, kind, filters, since=None, until=None):
+    """按相等条件和创建时间范围 [since, until) 逐条返回要导出的记录"""
+    if kind == 'users':
+        users = (user.to_dict() for user in data_manager.get_all_users())
+        return (user for user in users
+                if all(user.get(field) == value for field, value in filters.items()))
+
+    def in_range(record):
+        created_at = record.get('created_at') or ''
+        return (since is None or created_at >= since) and (until is None or created_at < until)
+
+    predicate = in_range if since or until else None
+    if kind == 'issues':
+        return data_manager.iter_issues(predicate, **filters)
+    return data_manager.iter_tasks(predicate, **filters)
+
+
+def _plain(record):
+    record = record.to_dict() if isinstance(record, Record) else dict(record)
+    record.pop('password_hash', None)
+    return record
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def export_stream(data_manager, kind, fmt, filters=None, since=None, until=None):
+    """逐块生成导出文件内容（bytes），用于流式响应或写入文件
+
+    记录逐条读取、攒够 EXPORT_CHUNK_ROWS 行输出一次，不在内存中生成整个文件。
+    CSV带BOM，便于Excel直接打开，导入时同样兼容。
+    """
+    records = _export_records(data_manager, kind, filters or {}, since, until)
+    if fmt == 'jsonl':
+        codec = data_manager.codec
+        while True:
+            chunk = [codec.dumps(_plain(record)) + b'\n'
+                     for record in islice(records, EXPORT_CHUNK_ROWS)]
+            if not chunk:
+                return
+            yield b''.join(chunk)
+
+    fields = CSV_FIELDS[kind]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(fields)
+    while True:
+        chunk = list(islice(records, EXPORT_CHUNK_ROWS))
+        for record in chunk:
+            writer.writerow([_csv_value(record.get(field)) for field in fields])
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if not chunk:
+            return
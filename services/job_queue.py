@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """后台任务的状态：queued -> running -> done / failed"""
+
+    def __init__(self, key, owner=None):
+        self.id = str(uuid.uuid4())
+        self.key = key
+        self.owner = owner
+        # 所有提交过该任务的用户（相同 key 的重复提交共用一个任务），都可以查看结果
+        self.owners = {owner} if owner is not None else set()
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        # 执行中的进度（由任务函数报告，如已处理的条数）
+        self.progress = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+        # 结束时间（time.time()），用于清理过期任务
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'progress': self.progress,
+            'owner': self.owner,
+            'owners': sorted(self.owners),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobQueue:
+    """执行耗时调用（如AI接口）的后台任务队列
+
+    - 最多 max_workers 个任务同时执行，其余排队，避免占满Web工作线程
+    - 相同 key 的任务在排队或执行中时直接返回已有任务，不重复执行
+    - 结束的任务保留 keep_seconds 秒供查询
+    - 指定 state_dir 时任务状态同时写入磁盘，多进程部署时其他进程也能查询
+    """
+
+    def __init__(self, max_workers=2, keep_seconds=3600, state_dir=None):
+        self.max_workers = max_workers
+        self.keep_seconds = keep_seconds
+        self.state_dir = state_dir
+        self._jobs = {}
+        # key -> 排队或执行中的任务
+        self._active = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._last_cleanup = 0
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def _pool(self):
+        # 调用方持有 self._lock；fork 出的子进程重新创建线程池
+        if self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='job')
+            self._pid = os.getpid()
+            self._jobs = {}
+            self._active = {}
+        return self._executor
+
+    def _path(self, job_id):
+        return os.path.join(self.state_dir, f'{job_id}.json')
+
+    def _save(self, job):
+        if not self.state_dir:
+            return
+        path = self._path(job.id)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _cleanup(self):
+        # 调用方持有 self._lock
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and now - job.finished > self.keep_seconds]:
+            del self._jobs[job_id]
+        if self.state_dir:
+            for name in os.listdir(self.state_dir):
+                path = os.path.join(self.state_dir, name)
+                try:
+                    if name.endswith('.json') and now - os.path.getmtime(path) > self.keep_seconds:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def submit(self, key, fn, *args, owner=None, progress=False, **kwargs):
+        """提交任务，返回 Job；相同 key 的任务尚未结束时返回该任务，并把 owner 加入可查看者
+
+        progress 为 True 时向 fn 传入 progress 参数，fn 调用 progress(info) 报告进度，
+        查询任务状态时在 progress 字段返回。
+        """
+        with self._lock:
+            pool = self._pool()
+            self._cleanup()
+            job = self._active.get(key)
+            if job is not None:
+                if owner is not None and owner not in job.owners:
+                    job.owners.add(owner)
+                    self._save(job)
+                return job
+            job = Job(key, owner)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._save(job)
+            if progress:
+                kwargs['progress'] = lambda info: self._report(job, info)
+            pool.submit(self._run, job, fn, args, kwargs)
+            return job
+
+    def _report(self, job, info):
+        with self._lock:
+            job.progress = info
+            self._save(job)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        self._save(job)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished = time.time()
+        job.finished_at = datetime.now().isoformat()
+        with self._lock:
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            self._save(job)
+
+    def get(self, job_id):
+        """返回任务状态字典，不存在或已过期时返回None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+        if not self.state_dir:
+            return None
+        try:
+            with open(self._path(os.path.basename(job_id)), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import markdown
+
+
+class MarkdownCache:
+    """知识文章 Markdown 渲染结果的 LRU 缓存
+
+    按 (文章id, 正文哈希) 缓存渲染后的HTML：正文修改后哈希改变，旧结果自然失效，
+    浏览次数等与正文无关的修改不影响缓存。内存中最多保留 max_entries 篇文章，
+    指定 cache_dir 时渲染结果同时保存到磁盘，重启后不必重新渲染。
+    """
+
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        # 文章id -> (正文哈希, HTML)，按最近使用排序
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _digest(content):
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _path(self, article_id):
+        # 文章id可能来自导入数据，不直接用作文件名
+        name = hashlib.md5(str(article_id).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + '.json')
+
+    def _load(self, article_id, digest):
+        try:
+            with open(self._path(article_id), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return cached.get('html') if cached.get('digest') == digest else None
+
+    def _save(self, article_id, digest, html):
+        path = self._path(article_id)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'digest': digest, 'html': html}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def render(self, article):
+        """返回文章正文渲染后的HTML，命中缓存时不再渲染"""
+        article_id = article['id']
+        content = article.get('content') or ''
+        digest = self._digest(content)
+        with self._lock:
+            entry = self._entries.get(article_id)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(article_id)
+                return entry[1]
+        html = self._load(article_id, digest) if self.cache_dir else None
+        if html is None:
+            html = markdown.markdown(content)
+            if self.cache_dir:
+                self._save(article_id, digest, html)
+        with self._lock:
+            self._entries[article_id] = (digest, html)
+            self._entries.move_to_end(article_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def discard(self, article_id):
+        """删除文章的缓存（文章被删除时调用）"""
+        with self._lock:
+            self._entries.pop(article_id, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(article_id))
+            except FileNotFoundError:
+                pass
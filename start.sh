@@ -36,6 +36,7 @@ pip install -r requirements.txt
 # 创建数据目录
 mkdir -p data
 mkdir -p data/uploads
+mkdir -p logs
 
 # 启动应用
 echo ""
@@ -46,11 +47,12 @@ echo "  默认管理员账号: admin / admin123"
 echo "========================================="
 echo ""
 
-# 使用nohup在后台运行
-nohup python app.py > logs/app.log 2>&1 &
+# 使用gunicorn在后台运行（多进程，配置见 gunicorn.conf.py）
+gunicorn -c gunicorn.conf.py --daemon wsgi:app
 
-echo "应用已启动，PID: $!"
-echo "日志文件: logs/app.log"
+sleep 2
+echo "应用已启动，主进程PID: $(cat logs/gunicorn.pid)"
+echo "日志文件: logs/app.log, logs/access.log"
 echo ""
 echo "停止应用请运行: ./stop.sh"
 
@@ -4,12 +4,15 @@
 
 echo "正在停止应用..."
 
-# 查找Python进程
-PID=$(ps aux | grep "python app.py" | grep -v grep | awk '{print $2}')
+cd "$(dirname "$0")"
 
-if [ -z "$PID" ]; then
+# gunicorn主进程收到TERM后等待处理中的请求结束再退出
+PIDFILE=logs/gunicorn.pid
+
+if [ ! -f "$PIDFILE" ] || ! kill -0 "$(cat $PIDFILE)" 2>/dev/null; then
     echo "应用未在运行"
 else
+    PID=$(cat $PIDFILE)
     kill $PID
     echo "应用已停止 (PID: $PID)"
 fi
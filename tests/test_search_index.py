@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+import unittest
+
+from models.data_manager import DataManager
+from models.search_index import SearchIndex, query_terms
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        documents = {
+            'csharp': '使用 C# 开发桌面程序',
+            'dotnet': 'ASP.NET Core 部署说明',
+            'cafe': 'Café 菜单整理',
+            'kana': 'ひらがな 入力の手順',
+            'paths': '日志目录 /var/log/app 和 a-b 测试',
+            'python': 'Python 开发规范',
+        }
+        for doc_id, content in documents.items():
+            self.index.add(doc_id, {'title': '', 'content': content})
+
+    def search(self, query):
+        return sorted(doc_id for doc_id, _ in self.index.search(query))
+
+    def test_symbols(self):
+        self.assertEqual(self.search('c#'), ['csharp'])
+        self.assertEqual(self.search('.net'), ['dotnet'])
+        self.assertEqual(self.search('/var/log'), ['paths'])
+        self.assertEqual(self.search('-'), ['paths'])
+
+    def test_accented_latin(self):
+        self.assertEqual(self.search('café'), ['cafe'])
+        self.assertEqual(self.search('CAFÉ'), ['cafe'])
+
+    def test_kana(self):
+        self.assertEqual(self.search('ひらがな'), ['kana'])
+        self.assertEqual(self.search('が'), ['kana'])
+
+    def test_short_ascii_and_chinese(self):
+        self.assertEqual(self.search('py'), ['python'])
+        self.assertEqual(self.search('开发'), ['csharp', 'python'])
+
+    def test_whitespace_query(self):
+        self.assertEqual(query_terms('  '), [])
+        self.assertEqual(self.search('  '), [])
+
+
+class SearchKnowledgeTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.data_dir)
+        self.data_manager.init_data()
+
+    def tearDown(self):
+        # 先保存延迟写入的索引，避免进程退出时写入已删除的目录
+        self.data_manager._index_saver.flush()
+        shutil.rmtree(self.data_dir)
+
+    def test_search_knowledge(self):
+        self.data_manager.create_knowledge('C# 编码规范', '命名和异常处理', '开发', 'admin')
+        self.data_manager.create_knowledge('.NET 升级', '从 4.8 升级到 8.0', '运维', 'admin')
+        self.data_manager.create_knowledge('Café 活动', '团队活动安排', '其他', 'admin')
+        titles = lambda query: [k['title'] for k in self.data_manager.search_knowledge(query)]
+        self.assertEqual(titles('c#'), ['C# 编码规范'])
+        self.assertEqual(titles('.net'), ['.NET 升级'])
+        self.assertEqual(titles('café'), ['Café 活动'])
+        self.assertEqual(titles('8.0'), ['.NET 升级'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,8 @@
+"""WSGI入口
+
+gunicorn:  gunicorn -c gunicorn.conf.py wsgi:app
+waitress:  waitress-serve --listen=0.0.0.0:4000 --threads=8 wsgi:app
+"""
+from app import create_app
+
+app = create_app()